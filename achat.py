@@ -3,6 +3,7 @@ load_dotenv()
 
 import os
 import json
+import threading
 import time
 from decimal import Decimal
 from web3 import Web3
@@ -11,14 +12,22 @@ from web3.middleware import geth_poa_middleware
 from config import (
     WSS_RPC_URL,
     PRIVATE_KEY,
-    WALLET_ADDRESS,
+    WALLET_KEYS,
+    TREASURY_ADDRESS,
+    SWEEP_RESERVE,
     ROUTER_ADDRESS,
     WBNB_ADDRESS,
     SLIPPAGE,
     BUY_AMOUNT,
-    TIMEOUT
+    TIMEOUT,
+    PAPER_TRADING
 )
 from telegram_alert import notify_buy, notify_sell, notify_summary, notify_error
+from journal import log_tx, log_fill, log_pnl, log_stage
+from rpc_cache import install as install_rpc_cache
+from wallets import WalletPool
+from paper import FillSimulator
+from token_checker import measure_taxes
 
 # ▶️ Take-profit levels
 TP1 = 50    # % pour vente partielle
@@ -26,9 +35,34 @@ TP2 = 250   # % pour vente totale
 HALF_SELL = 0.5
 FULL_SELL = 1.0
 
+# ⏳ Attente prolongée d'un achat envoyé dont le suivi a échoué (s)
+BUY_RECOVERY_TIMEOUT = 600
+
+def serialize_requests_middleware(make_request, w3):
+    """
+    Une requête à la fois sur le provider. Le WebsocketProvider partage une
+    seule socket : deux workers en recv() simultané font échouer la requête
+    et ferment la socket pour tous.
+    """
+    lock = threading.Lock()
+
+    def middleware(method, params):
+        with lock:
+            return make_request(method, params)
+
+    return middleware
+
+
 # ⚙️ Web3 + PoA middleware
-web3 = Web3(Web3.WebsocketProvider(WSS_RPC_URL))
+if WSS_RPC_URL.startswith('ws'):
+    web3 = Web3(Web3.WebsocketProvider(WSS_RPC_URL))
+else:
+    web3 = Web3(Web3.HTTPProvider(WSS_RPC_URL))
 web3.middleware_onion.inject(geth_poa_middleware, layer=0)
+install_rpc_cache(web3)
+if isinstance(web3.provider, Web3.WebsocketProvider):
+    # Couche la plus interne : les hits du cache RPC ne prennent pas le verrou
+    web3.middleware_onion.inject(serialize_requests_middleware, name="serialize", layer=0)
 if not web3.is_connected():
     notify_error("Connexion Web3 échouée dans sniper")
     exit(1)
@@ -45,6 +79,42 @@ router = web3.eth.contract(
     abi=ROUTER_ABI
 )
 
+# 📝 Simulateur de fills (mode paper uniquement)
+paper_sim = FillSimulator(web3, router) if PAPER_TRADING else None
+
+# 👛 Pool de wallets : une position par wallet, nonces indépendants
+wallet_pool = WalletPool(web3, WALLET_KEYS or [PRIVATE_KEY], TREASURY_ADDRESS)
+
+# 📒 Comptabilité des positions réelles (wei), alimentée par les receipts :
+#    PnL réalisé = ETH reçus des ventes - montant acheté - gas payé
+WITHDRAWAL_TOPIC = Web3.keccak(text="Withdrawal(address,uint256)").hex()
+ledger = {}
+ledger_lock = threading.Lock()
+
+
+def _book(token_address: str, **amounts):
+    with ledger_lock:
+        pos = ledger.setdefault(Web3.to_checksum_address(token_address),
+                                {"cost_wei": 0, "proceeds_wei": 0, "gas_wei": 0})
+        for field, value in amounts.items():
+            pos[field] += value
+
+
+def _eth_received(receipt) -> int:
+    """
+    ETH versés par le router lors d'une vente : Withdrawal WETH émis au
+    nom du router (swapExactTokensForETH… débouclé via WETH.withdraw).
+    """
+    total = 0
+    for log in receipt.get('logs', []):
+        topics = [t.hex() if isinstance(t, bytes) else t for t in log['topics']]
+        if (log['address'].lower() == WBNB_ADDRESS.lower() and topics
+                and topics[0] == WITHDRAWAL_TOPIC
+                and int(topics[1], 16) == int(ROUTER_ADDRESS, 16)):
+            data = log['data']
+            total += int(data.hex() if isinstance(data, bytes) else data, 16)
+    return total
+
 # 🔢 Cache des décimales
 decimals_cache = {}
 def get_decimals(token_addr: str) -> int:
@@ -60,13 +130,54 @@ def get_decimals(token_addr: str) -> int:
         notify_error(f"Erreur récupération décimales pour {token_addr}: {e}")
         return 18  # fallback safe
 
-def buy_token(token_address: str, base: str = WBNB_ADDRESS) -> Decimal:
+def acquire_wallet(token_address: str):
+    """
+    Affecte à la position le wallet le moins chargé ayant de quoi acheter
+    BUY_AMOUNT. None si tous les wallets sont occupés.
     """
-    Achète `token_address` en partant de `base` (par défaut WBNB).
+    amt_in = int(Decimal(BUY_AMOUNT) * 10**18)
+    return wallet_pool.acquire(token_address, 0 if paper_sim else amt_in)
+
+
+def buy_token(
+    token_address: str,
+    base: str = WBNB_ADDRESS,
+    wallet=None
+) -> Decimal:
     """
+    Achète `token_address` en partant de `base` (par défaut WBNB), depuis
+    `wallet` s'il a déjà été affecté par acquire_wallet(), sinon depuis le
+    wallet le moins chargé du pool. En mode paper, le fill est simulé avec
+    les taxes de transfert mesurées pendant la latence simulée.
+    """
+    # 1) Montant en entrée (en BNB → wei) et wallet affecté à la position
+    amt_in = int(Decimal(BUY_AMOUNT) * 10**18)
+    if wallet is None:
+        wallet = acquire_wallet(token_address)
+    if wallet is None:
+        notify_error(f"Aucun wallet disponible pour {token_address}")
+        return Decimal(0)
+
+    if paper_sim:
+        try:
+            raw = paper_sim.buy(token_address, base, amt_in, lambda: measure_taxes(
+                web3, router, token_address, base, wallet.address, ERC20_ABI, WBNB_ADDRESS
+            ))
+            if raw <= 0:
+                # Position perdue : PnL = -(montant engagé + gas), wallet libéré
+                notify_error(f"Achat paper sans tokens reçus pour {token_address}")
+                paper_sim.close(token_address, 0.0, 0)
+                wallet_pool.release(token_address)
+                return Decimal(0)
+            return Decimal(raw) / Decimal(10**get_decimals(token_address))
+        except Exception as e:
+            notify_error(f"Achat paper échoué sur {token_address}: {e}")
+            wallet_pool.release(token_address)
+            return Decimal(0)
+
+    started = time.perf_counter()
+    txh = None
     try:
-        # 1) Montant en entrée (en BNB → wei)
-        amt_in = int(Decimal(BUY_AMOUNT) * 10**18)
         path = [
             Web3.to_checksum_address(base),
             Web3.to_checksum_address(token_address)
@@ -85,14 +196,14 @@ def buy_token(token_address: str, base: str = WBNB_ADDRESS) -> Decimal:
         # 4) Construction TX
         tx = router.functions.swapExactETHForTokensSupportingFeeOnTransferTokens(
             min_out, path,
-            Web3.to_checksum_address(WALLET_ADDRESS),
+            wallet.address,
             int(time.time()) + 60
         ).build_transaction({
-            'from':                Web3.to_checksum_address(WALLET_ADDRESS),
+            'from':                wallet.address,
             'value':               amt_in,
             'maxFeePerGas':        max_fee,
             'maxPriorityFeePerGas': tip,
-            'nonce':               web3.eth.get_transaction_count(WALLET_ADDRESS)
+            'nonce':               wallet.next_nonce()
         })
 
         # 5) Estimation et ajout de marge gas
@@ -100,14 +211,19 @@ def buy_token(token_address: str, base: str = WBNB_ADDRESS) -> Decimal:
         tx['gas'] = int(est * 1.1)
 
         # 6) Signature & envoi
-        signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-        txh    = web3.eth.send_raw_transaction(signed.rawTransaction)
+        sent_at = time.perf_counter()
+        txh    = wallet.sign_and_send(tx)
         print(f"🟢 Achat TX envoyée: {txh.hex()}")
+        log_stage("buy_submit", sent_at - started, token_address)
+        log_tx("buy", token_address, txh.hex(), amt_in)
 
         # 7) Attente du receipt
         receipt = web3.eth.wait_for_transaction_receipt(txh)
+        log_stage("buy_inclusion", time.perf_counter() - sent_at, token_address)
+        fee_wei = _log_receipt("buy", token_address, txh, receipt)
         if receipt.status != 1:
             notify_error(f"Achat échoué pour {token_address}, status={receipt.status}")
+            wallet_pool.release(token_address)
             return Decimal(0)
 
         # 8) Analyse du receipt
@@ -119,9 +235,14 @@ def buy_token(token_address: str, base: str = WBNB_ADDRESS) -> Decimal:
 
         # 9) Récupération du solde reçu
         tok      = web3.eth.contract(address=token_address, abi=ERC20_ABI)
-        raw_bal  = tok.functions.balanceOf(WALLET_ADDRESS).call()
+        raw_bal  = tok.functions.balanceOf(wallet.address).call()
         decs     = get_decimals(token_address)
         amt_recv = Decimal(raw_bal) / Decimal(10**decs)
+        _book(token_address, cost_wei=amt_in, gas_wei=fee_wei)
+        if raw_bal <= 0:
+            notify_error(f"Achat sans tokens reçus pour {token_address} (TX {txh.hex()})")
+            wallet_pool.release(token_address)
+            return Decimal(0)
 
         # 10) Notification détaillée
         try:
@@ -140,27 +261,89 @@ def buy_token(token_address: str, base: str = WBNB_ADDRESS) -> Decimal:
         return amt_recv
 
     except Exception as e:
-        notify_error(f"Achat échoué sur {token_address}: {e}")
+        if txh is None:
+            notify_error(f"Achat échoué sur {token_address}: {e}")
+            wallet.resync()
+            wallet_pool.release(token_address)
+            return Decimal(0)
+        # TX déjà envoyée : elle peut encore être incluse, le wallet reste affecté
+        notify_error(f"Suivi de l'achat {txh.hex()} échoué sur {token_address}: {e}")
+        return _recover_buy(token_address, wallet, txh, amt_in)
+
+
+def _recover_buy(token_address: str, wallet, txh, amt_in: int) -> Decimal:
+    """
+    Reprise d'un achat envoyé dont le suivi a échoué (timeout du receipt,
+    erreur RPC…). Si la TX est incluse avec des tokens reçus, la position
+    est reprise et l'appelant la surveille ; si elle échoue, le wallet est
+    libéré. Sans nouvelles après BUY_RECOVERY_TIMEOUT, le wallet reste
+    affecté : des tokens peuvent encore y arriver, il ne doit être ni
+    réaffecté ni balayé avant une vérification manuelle.
+    """
+    try:
+        receipt = web3.eth.wait_for_transaction_receipt(txh, timeout=BUY_RECOVERY_TIMEOUT)
+        fee_wei = _log_receipt("buy", token_address, txh, receipt)
+        raw_bal = 0
+        if receipt.status == 1:
+            tok     = web3.eth.contract(address=token_address, abi=ERC20_ABI)
+            raw_bal = tok.functions.balanceOf(wallet.address).call()
+    except Exception as e:
+        notify_error(f"Achat {txh.hex()} sur {token_address} non confirmé : {e}. "
+                     f"Wallet {wallet.address} bloqué, à vérifier manuellement")
+        return Decimal(0)
+
+    if raw_bal <= 0:
+        notify_error(f"Achat {txh.hex()} sur {token_address} sans tokens reçus (status={receipt.status})")
+        wallet_pool.release(token_address)
         return Decimal(0)
 
+    _book(token_address, cost_wei=amt_in, gas_wei=fee_wei)
+    print(f"♻️ Achat {txh.hex()} repris : position {token_address} sur {wallet.address}")
+    return Decimal(raw_bal) / Decimal(10**get_decimals(token_address))
+
+
+def _log_receipt(kind: str, token_address: str, txh, receipt) -> int:
+    """
+    Journalise le fill et retourne les frais de gas payés (wei).
+    """
+    fee_wei = receipt.gasUsed * receipt.get('effectiveGasPrice', 0)
+    log_fill(kind, token_address, txh.hex(), receipt.status, receipt.blockNumber,
+             receipt.gasUsed, float(web3.from_wei(fee_wei, 'ether')))
+    return fee_wei
+
 
 def sell_token(token_address: str, fraction: float = 1.0, base: str = WBNB_ADDRESS) -> str:
     """
-    Vend la fraction `fraction` de `token_address` contre `base`.
+    Vend la fraction `fraction` de `token_address` contre `base`, depuis le
+    wallet qui détient la position.
     """
+    wallet = wallet_pool.wallet_for(token_address)
+    if wallet is None:
+        notify_error(f"Vente impossible : aucune position ouverte sur {token_address}")
+        return None
+
+    if paper_sim:
+        try:
+            paper_sim.sell(token_address, base, fraction)
+            return "paper"
+        except Exception as e:
+            notify_error(f"Vente paper échouée pour {token_address}: {e}")
+            return None
+
     try:
         tok    = web3.eth.contract(address=token_address, abi=ERC20_ABI)
-        bal    = tok.functions.balanceOf(WALLET_ADDRESS).call()
+        bal    = tok.functions.balanceOf(wallet.address).call()
         amt    = int(bal * fraction)
 
         # 1) Approve
         ap_tx  = tok.functions.approve(ROUTER_ADDRESS, amt).build_transaction({
-            'from':  Web3.to_checksum_address(WALLET_ADDRESS),
-            'nonce': web3.eth.get_transaction_count(WALLET_ADDRESS)
+            'from':  wallet.address,
+            'nonce': wallet.next_nonce()
         })
-        sap    = web3.eth.account.sign_transaction(ap_tx, PRIVATE_KEY)
-        tx_ap  = web3.eth.send_raw_transaction(sap.rawTransaction)
-        web3.eth.wait_for_transaction_receipt(tx_ap)
+        tx_ap  = wallet.sign_and_send(ap_tx)
+        log_tx("approve", token_address, tx_ap.hex())
+        _book(token_address, gas_wei=_log_receipt(
+            "approve", token_address, tx_ap, web3.eth.wait_for_transaction_receipt(tx_ap)))
 
         # 2) Swap back
         path   = [
@@ -169,15 +352,18 @@ def sell_token(token_address: str, fraction: float = 1.0, base: str = WBNB_ADDRE
         ]
         sw_tx  = router.functions.swapExactTokensForETHSupportingFeeOnTransferTokens(
             amt, 0, path,
-            WALLET_ADDRESS,
+            wallet.address,
             int(time.time()) + 60
         ).build_transaction({
-            'from':  Web3.to_checksum_address(WALLET_ADDRESS),
-            'nonce': web3.eth.get_transaction_count(WALLET_ADDRESS)
+            'from':  wallet.address,
+            'nonce': wallet.next_nonce()
         })
-        ssw    = web3.eth.account.sign_transaction(sw_tx, PRIVATE_KEY)
-        txh    = web3.eth.send_raw_transaction(ssw.rawTransaction)
-        web3.eth.wait_for_transaction_receipt(txh)
+        txh    = wallet.sign_and_send(sw_tx)
+        log_tx("sell", token_address, txh.hex())
+        receipt = web3.eth.wait_for_transaction_receipt(txh)
+        _book(token_address,
+              gas_wei=_log_receipt("sell", token_address, txh, receipt),
+              proceeds_wei=_eth_received(receipt))
 
         try:
             notify_sell(token_address, fraction, txh.hex())
@@ -188,6 +374,7 @@ def sell_token(token_address: str, fraction: float = 1.0, base: str = WBNB_ADDRE
 
     except Exception as e:
         notify_error(f"Vente échouée pour {token_address}: {e}")
+        wallet.resync()
         return None
 
 
@@ -208,6 +395,7 @@ def monitor_and_sell(token_address: str, amount_bought: Decimal, base: str = WBN
         ).call()[-1]
     except Exception as e:
         notify_error(f"Erreur estimation init PnL: {e}")
+        close_position(token_address)
         return
 
     # 2) Boucle de surveillance
@@ -240,11 +428,37 @@ def monitor_and_sell(token_address: str, amount_bought: Decimal, base: str = WBN
 
     # 3) Envoi du résumé
     try:
-        final_out = router.functions.getAmountsOut(
-            int(amount_bought * 10**decs),
-            [token_address, base]
-        ).call()[-1]
-        net_pnl   = (Decimal(final_out) / Decimal(init_out) - 1) * BUY_AMOUNT
+        if paper_sim:
+            # PnL would-be à partir des fills simulés
+            net_pnl = paper_sim.close(token_address, time.time() - start, trades)
+        else:
+            # PnL réalisé à partir des receipts (comparable à FillSimulator.close)
+            with ledger_lock:
+                pos = ledger.pop(Web3.to_checksum_address(token_address), None) or {}
+            net_pnl = Decimal(
+                pos.get("proceeds_wei", 0) - pos.get("cost_wei", 0) - pos.get("gas_wei", 0)
+            ) / Decimal(10**18)
+            log_pnl(token_address, float(net_pnl), time.time() - start, trades)
         notify_summary(net_pnl, int(time.time() - start), trades)
     except Exception as e:
         notify_error(f"Erreur résumé final: {e}")
+
+    close_position(token_address)
+
+
+def close_position(token_address: str):
+    """
+    Libère le wallet de la position et balaie ses profits (solde au-delà
+    de son capital de départ) vers la trésorerie, sans descendre sous
+    BUY_AMOUNT + SWEEP_RESERVE.
+    """
+    with ledger_lock:
+        ledger.pop(Web3.to_checksum_address(token_address), None)
+    wallet = wallet_pool.release(token_address)
+    if paper_sim or wallet is None:
+        return
+    try:
+        keep_wei = web3.to_wei(BUY_AMOUNT, 'ether') + web3.to_wei(SWEEP_RESERVE, 'ether')
+        wallet_pool.sweep(wallet, keep_wei)
+    except Exception as e:
+        notify_error(f"Erreur balayage trésorerie: {e}")
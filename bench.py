@@ -0,0 +1,194 @@
+"""
+Benchmark de débit du pipeline watch_for_pairs → is_token_safe → buy_token
+contre le noeud simulé (mock_node.py).
+
+Mesure :
+  • paires/s traitées après une tempête de PairCreated
+  • time-to-buy p50/p99 (bloc de la tempête → eth_sendRawTransaction)
+  • appels RPC par candidat (total et par méthode)
+
+Usage :
+    python bench.py --pairs 200 --latency default=15:5 --latency eth_call=25:10:0.01
+    python bench.py --pairs 50 --json bench.json --min-pps 5 --max-p99 30
+Code de sortie 1 si un seuil (--min-pps / --max-p99) n'est pas tenu.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from journal import percentile
+from mock_node import MockNode, serve, parse_latency, DEFAULT_FACTORY, DEFAULT_ROUTER, DEFAULT_WETH
+
+# Clé de test publique (documentation web3.py) — ne jamais l'approvisionner
+BENCH_PRIVATE_KEY = "0x4c0883a69102937d6231471b5dbb6204fe5129617082792ae468d01a3f362318"
+BENCH_WALLET      = "0x2c7536E3605D9C16a7a3D7b1898e529396a65c23"
+
+
+def configure_env(url: str, watch_mode: str):
+    """
+    Pointe la config du bot sur le noeud simulé. Doit précéder tout import
+    de config/watcher2/achat (load_dotenv n'écrase pas les variables posées).
+    """
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    os.environ.update({
+        "WSS_RPC_URL":        url,
+        "HTTP_RPC_URL":       url,
+        "PRIVATE_KEY":        BENCH_PRIVATE_KEY,
+        "WALLET_ADDRESS":     BENCH_WALLET,
+        "FACTORY_ADDRESS":    DEFAULT_FACTORY,
+        "ROUTER_ADDRESS":     DEFAULT_ROUTER,
+        "WBNB_ADDRESS":       DEFAULT_WETH,
+        "BASE_TOKENS":        DEFAULT_WETH,
+        "BSCSCAN_API_URL":    url + "/api",
+        "BSCSCAN_API_KEY":    "bench",
+        "MIN_LIQUIDITY":      str(10**18),
+        "WATCH_MODE":         watch_mode,
+        "TELEGRAM_BOT_TOKEN": "",
+        "TELEGRAM_CHAT_ID":   "",
+        "JOURNAL_PATH":       os.path.join(tmp, "journal.bin"),
+        "BYTECODE_INDEX_PATH": os.path.join(tmp, "bytecode_index.jsonl"),
+    })
+
+
+def run(
+    n_pairs: int = 200,
+    latency=None,
+    honeypot_ratio: float = 0.0,
+    block_time: float = 0.25,
+    watch_mode: str = "auto",
+    timeout: float = 300.0,
+    verbose: bool = False
+) -> dict:
+    node = MockNode(block_time=block_time, latency=latency, honeypot_ratio=honeypot_ratio)
+    server, url = serve(node)
+    configure_env(url, watch_mode)
+
+    # Imports tardifs : la config est lue à l'import
+    from watcher2 import watch_for_pairs
+    from achat import buy_token, wallet_pool
+
+    from rpc_cache import rpc_stats, reset_stats
+
+    buys = []
+    done = threading.Event()
+    state = {"expected": None}
+
+    def consume():
+        try:
+            for info in watch_for_pairs():
+                buy_token(info["token"], info["base"])
+                buys.append(time.time())
+                # Pas de revente dans le bench : on libère le wallet tout de suite
+                wallet_pool.release(info["token"])
+                if state["expected"] is not None and len(buys) >= state["expected"]:
+                    break
+        finally:
+            done.set()
+
+    out = sys.stdout if verbose else io.StringIO()
+    with contextlib.redirect_stdout(out):
+        worker = threading.Thread(target=consume, name="bench-pipeline", daemon=True)
+        worker.start()
+
+        # Laisse le watcher s'installer (filtre, estimation du temps de bloc)
+        time.sleep(max(1.0, 4 * block_time))
+        node.reset_stats()
+        reset_stats()
+        node.storm(n_pairs)
+        state["expected"] = n_pairs - len(node.honeypots)
+        if state["expected"] == 0:
+            done.set()
+        done.wait(timeout)
+
+    node.stop()
+    server.shutdown()
+
+    storm_at = node.storm_at
+    with node.lock:
+        calls = dict(node.calls)
+        sent = list(node.sent_at)
+    finished = buys[-1] if buys else time.time()
+    elapsed = max(finished - storm_at, 1e-9)
+    ttb = sorted(t - storm_at for t in sent)
+    total_calls = sum(calls.values())
+    cached = sum(st["cached"] + st["deduped"] for st in rpc_stats().values())
+
+    return {
+        "pairs":           n_pairs,
+        "honeypots":       len(node.honeypots),
+        "bought":          len(buys),
+        "completed":       len(buys) >= state["expected"],
+        "elapsed_s":       elapsed,
+        "pairs_per_s":     n_pairs / elapsed,
+        "ttb_p50_s":       percentile(ttb, 50),
+        "ttb_p99_s":       percentile(ttb, 99),
+        "rpc_calls":       total_calls,
+        "rpc_per_pair":    total_calls / n_pairs if n_pairs else 0.0,
+        "rpc_saved":       cached,
+        "rpc_by_method":   {m: c / n_pairs for m, c in sorted(calls.items(), key=lambda kv: -kv[1])},
+    }
+
+
+def print_report(res: dict):
+    print(f"🏁 Benchmark pipeline ({res['pairs']} paires, {res['honeypots']} honeypots)")
+    print(f"• Achats          : {res['bought']}{'' if res['completed'] else ' (INCOMPLET, timeout)'}")
+    print(f"• Durée           : {res['elapsed_s']:.2f}s")
+    print(f"• Débit           : {res['pairs_per_s']:.1f} paires/s")
+    print(f"• Time-to-buy p50 : {res['ttb_p50_s'] * 1000:.0f} ms")
+    print(f"• Time-to-buy p99 : {res['ttb_p99_s'] * 1000:.0f} ms")
+    print(f"• RPC / candidat  : {res['rpc_per_pair']:.1f} ({res['rpc_calls']} appels, {res['rpc_saved']} évités par le cache)")
+    for method, per_pair in res["rpc_by_method"].items():
+        print(f"    {method:<32} {per_pair:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de débit du sniper contre un noeud simulé")
+    parser.add_argument("--pairs", type=int, default=200, help="taille de la tempête PairCreated")
+    parser.add_argument("--latency", action="append", default=[],
+                        help="méthode=latence_ms:gigue_ms:taux_échec (répétable, 'default' pour toutes)")
+    parser.add_argument("--honeypot-ratio", type=float, default=0.0)
+    parser.add_argument("--block-time", type=float, default=0.25)
+    parser.add_argument("--watch-mode", default="auto", choices=["auto", "filter", "range"])
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--json", help="écrit les résultats dans ce fichier")
+    parser.add_argument("--min-pps", type=float, help="échec si débit < seuil (paires/s)")
+    parser.add_argument("--max-p99", type=float, help="échec si time-to-buy p99 > seuil (s)")
+    parser.add_argument("--verbose", action="store_true", help="affiche la sortie du bot")
+    parser.add_argument("--sites", action="store_true", help="détaille les appels RPC par site d'appel")
+    args = parser.parse_args()
+
+    res = run(
+        n_pairs=args.pairs,
+        latency=parse_latency(args.latency),
+        honeypot_ratio=args.honeypot_ratio,
+        block_time=args.block_time,
+        watch_mode=args.watch_mode,
+        timeout=args.timeout,
+        verbose=args.verbose
+    )
+    print_report(res)
+    if args.sites:
+        from rpc_cache import print_rpc_stats
+        print_rpc_stats()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(res, f, indent=2)
+
+    failed = not res["completed"]
+    if args.min_pps is not None and res["pairs_per_s"] < args.min_pps:
+        print(f"❌ Débit {res['pairs_per_s']:.1f} < {args.min_pps} paires/s")
+        failed = True
+    if args.max_p99 is not None and res["ttb_p99_s"] > args.max_p99:
+        print(f"❌ Time-to-buy p99 {res['ttb_p99_s']:.2f}s > {args.max_p99}s")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Index des verdicts par empreinte de bytecode runtime.
+
+La plupart des tokens scam sont des redéploiements d'une poignée de
+templates. L'empreinte est un hash du code runtime (eth_getCode) normalisé :
+  • métadonnées CBOR de solc retirées (hash IPFS/bzzr, version du compilo)
+  • opérandes PUSH20..PUSH32 mis à zéro (adresses, immuables du constructeur)
+
+Chaque verdict définitif de is_token_safe (revente refusée, taxe) est ajouté
+à un fichier JSON Lines append-only, rejoué au démarrage. Un template vu au
+moins BYTECODE_MIN_SAMPLES fois avec toujours le même verdict est ensuite
+rejeté ou accéléré avec un seul appel RPC. Un verdict dont la dernière
+simulation date de plus de BYTECODE_TTL secondes n'est plus appliqué : le
+prochain clone est re-simulé, ce qui rafraîchit last_seen.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from web3 import Web3
+
+from config import BYTECODE_MIN_SAMPLES, BYTECODE_TTL
+
+# Premier octet d'une map CBOR de 1 à 3 entrées (métadonnées solc)
+_CBOR_MAP_HEADERS = (0xa1, 0xa2, 0xa3)
+
+
+def normalize_code(code: bytes) -> bytes:
+    """
+    Retire les métadonnées solc et neutralise les constantes spécifiques
+    au déploiement (adresses, immuables).
+    """
+    # 1) Métadonnées CBOR : leur longueur est codée sur les 2 derniers octets
+    if len(code) > 2:
+        meta_len = int.from_bytes(code[-2:], "big")
+        if 0 < meta_len <= len(code) - 2 and code[-2 - meta_len] in _CBOR_MAP_HEADERS:
+            code = code[:-2 - meta_len]
+
+    # 2) Opérandes PUSH20..PUSH32 à zéro (désassemblage linéaire)
+    out = bytearray(code)
+    i = 0
+    while i < len(out):
+        op = out[i]
+        if 0x60 <= op <= 0x7f:
+            n = op - 0x5f
+            if n >= 20:
+                end = min(i + 1 + n, len(out))
+                out[i + 1:end] = bytes(end - i - 1)
+            i += 1 + n
+        else:
+            i += 1
+    return bytes(out)
+
+
+def fingerprint(code: bytes) -> Optional[str]:
+    """
+    Empreinte du code runtime, None si pas de code (EOA / pas encore déployé).
+    """
+    if not code:
+        return None
+    return hashlib.sha256(normalize_code(bytes(code))).hexdigest()
+
+
+class BytecodeIndex:
+    """
+    Empreinte → statistiques de verdicts, persistées en JSON Lines.
+    """
+
+    def __init__(self, path: str, min_samples: int = BYTECODE_MIN_SAMPLES, ttl: int = BYTECODE_TTL):
+        self.path = path
+        self.min_samples = min_samples
+        self.ttl = ttl
+        self.entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    continue  # ligne tronquée (arrêt brutal) ou incomplète
+        print(f"🧬 Index bytecode : {len(self.entries)} templates chargés")
+
+    def _apply(self, rec: dict):
+        # Champs obligatoires lus avant toute écriture : une ligne incomplète
+        # ne laisse pas d'entrée vide
+        fp, safe = rec["fp"], rec["safe"]
+        e = self.entries.setdefault(fp, {
+            "safe": 0, "unsafe": 0, "reason": None, "last_seen": 0
+        })
+        if safe:
+            e["safe"] += 1
+        else:
+            e["unsafe"] += 1
+            e["reason"] = rec.get("reason")
+        e["last_seen"] = rec.get("ts", 0)
+
+    def lookup(self, w3: Web3, token: str) -> Tuple[Optional[str], Optional[bool]]:
+        """
+        Un seul appel RPC (eth_getCode). Retourne (empreinte, verdict) :
+        True = template sûr connu, False = template rejeté connu, None = inconnu,
+        verdicts contradictoires ou expirés.
+        """
+        fp = fingerprint(w3.eth.get_code(Web3.to_checksum_address(token)))
+        return fp, self.verdict(fp)
+
+    def verdict(self, fp: Optional[str]) -> Optional[bool]:
+        e = self.entries.get(fp) if fp else None
+        if not e:
+            return None
+        if self.ttl and time.time() - e["last_seen"] > self.ttl:
+            return None
+        if e["unsafe"] >= self.min_samples and e["safe"] == 0:
+            return False
+        if e["safe"] >= self.min_samples and e["unsafe"] == 0:
+            return True
+        return None
+
+    def reason(self, fp: str) -> str:
+        e = self.entries.get(fp) or {}
+        return e.get("reason") or "template rejeté"
+
+    def record(self, fp: Optional[str], safe: bool, reason: str):
+        """
+        Ajoute un verdict définitif de simulation complète à l'index.
+        """
+        if not fp:
+            return
+        rec = {"fp": fp, "safe": bool(safe), "reason": reason, "ts": int(time.time())}
+        with self._lock:
+            self._apply(rec)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
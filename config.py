@@ -15,6 +15,17 @@ WALLET_ADDRESS  = Web3.to_checksum_address(os.getenv("WALLET_ADDRESS"))
 FACTORY_ADDRESS = Web3.to_checksum_address(os.getenv("FACTORY_ADDRESS"))
 ROUTER_ADDRESS  = Web3.to_checksum_address(os.getenv("ROUTER_ADDRESS"))
 BSCSCAN_API_KEY   = os.getenv("BSCSCAN_API_KEY")
+BSCSCAN_API_URL   = os.getenv("BSCSCAN_API_URL", "https://api.bscscan.com/api")
+
+# Token natif wrappé (WETH sur BASE, WBNB sur BSC)
+WBNB_ADDRESS = Web3.to_checksum_address(
+    os.getenv("WBNB_ADDRESS", "0x4200000000000000000000000000000000000006")
+)
+
+# --- Multi-wallet (clés séparées par virgule ; vide = PRIVATE_KEY seul) ---
+WALLET_KEYS      = [k.strip() for k in os.getenv("WALLET_KEYS", "").split(",") if k.strip()]
+TREASURY_ADDRESS = Web3.to_checksum_address(os.getenv("TREASURY_ADDRESS") or WALLET_ADDRESS)
+SWEEP_RESERVE    = float(os.getenv("SWEEP_RESERVE", "0.005"))   # ETH de gas gardés sur chaque wallet, en plus de BUY_AMOUNT
 
 # --- Sniper settings ---
 SLIPPAGE      = int(os.getenv("SLIPPAGE", "10"))
@@ -32,3 +43,30 @@ BASE_TOKENS = [
     for addr in os.getenv("BASE_TOKENS", "").split(",")
     if addr
 ]
+
+# --- Surveillance PairCreated ---
+# auto = filtre serveur (eth_newFilter) si HTTP, plages eth_getLogs sinon
+WATCH_MODE      = os.getenv("WATCH_MODE", "auto")   # auto | filter | range
+LOGS_CHUNK_SIZE = int(os.getenv("LOGS_CHUNK_SIZE", "1000"))
+HTTP_POLL_MIN   = float(os.getenv("HTTP_POLL_MIN", "0.25"))
+HTTP_POLL_MAX   = float(os.getenv("HTTP_POLL_MAX", "3.0"))
+
+# --- Cache RPC (eth_call par bloc + dédup) ---
+RPC_CACHE     = os.getenv("RPC_CACHE", "1") == "1"
+RPC_CACHE_TTL = float(os.getenv("RPC_CACHE_TTL", "1.0"))   # s, pour "latest" sans nouveau bloc vu
+RPC_STATS     = os.getenv("RPC_STATS", "1") == "1"          # comptage par site d'appel
+
+# --- Index des empreintes de bytecode (vide = désactivé) ---
+BYTECODE_INDEX_PATH  = os.getenv("BYTECODE_INDEX_PATH", "bytecode_index.jsonl")
+BYTECODE_MIN_SAMPLES = int(os.getenv("BYTECODE_MIN_SAMPLES", "2"))   # verdicts identiques avant de court-circuiter
+BYTECODE_TTL         = int(os.getenv("BYTECODE_TTL", "86400"))       # s sans simulation avant de re-simuler un template
+
+# --- Paper trading : pipeline réel, fills simulés, aucune TX envoyée ---
+PAPER_TRADING        = os.getenv("PAPER_TRADING", "0") == "1"
+PAPER_SUBMIT_LATENCY = float(os.getenv("PAPER_SUBMIT_LATENCY", "2.0"))   # s, si le journal n'a pas d'achats réels
+PAPER_GAS_UNITS      = int(os.getenv("PAPER_GAS_UNITS", "200000"))
+
+# --- Journal binaire (vide = désactivé) ---
+JOURNAL_PATH           = os.getenv("JOURNAL_PATH", "journal.bin")
+JOURNAL_FLUSH_INTERVAL = float(os.getenv("JOURNAL_FLUSH_INTERVAL", "0.2"))
+JOURNAL_FSYNC_INTERVAL = float(os.getenv("JOURNAL_FSYNC_INTERVAL", "1.0"))
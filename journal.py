@@ -0,0 +1,493 @@
+"""
+Journal binaire append-only des décisions et trades du bot.
+
+Chaque événement (paire candidate, verdict de filtre, durée d'étape, TX
+envoyée, fill, PnL réalisé) est encodé dans un enregistrement de taille
+fixe. L'écriture est bufferisée en mémoire et vidée par un thread de fond
+(flush périodique + fsync), le chemin chaud ne fait donc qu'un struct.pack.
+
+Les textes (raisons de rejet, noms d'étapes) sont internés dans un fichier
+compagnon `<journal>.names` (une ligne par id), ce qui garde les
+enregistrements compacts et permet d'agréger par raison sans décoder de
+chaînes.
+
+Usage CLI :
+    python journal.py summary  [--since 7d] [--path journal.bin]
+    python journal.py reasons  [--since 7d]
+    python journal.py latency  [--since 24h]
+    python journal.py trades   [--since 30d]
+"""
+import argparse
+import atexit
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# --- Format ---
+MAGIC = b"SNPJ\x01\x00\x00\x00"
+
+# ts, kind, flag, code, block, a, b, token, ref
+RECORD = struct.Struct("<dBBHIdd20s32s")
+# Même disposition mais sans token/ref : agrégations sans créer de bytes
+RECORD_HEAD = struct.Struct("<dBBHIdd52x")
+RECORD_SIZE = RECORD.size
+
+# Types d'enregistrement
+CANDIDATE = 1   # token, ref=pair, a/b = réserves
+VERDICT   = 2   # flag=1 si accepté, code=raison
+STAGE     = 3   # code=étape, a=durée (s)
+TX        = 4   # code=type de TX, ref=hash, a=valeur (wei)
+FILL      = 5   # code=type de TX, flag=status, block, a=gas utilisé, b=frais (ETH)
+PNL       = 6   # flag=1 si paper, code=nb de trades, a=PnL (ETH), b=durée de détention (s)
+
+KIND_NAMES = {
+    CANDIDATE: "candidate",
+    VERDICT:   "verdict",
+    STAGE:     "stage",
+    TX:        "tx",
+    FILL:      "fill",
+    PNL:       "pnl",
+}
+
+_ADDR_EMPTY = b"\x00" * 20
+_REF_EMPTY  = b"\x00" * 32
+
+
+def _to_bytes(value: Optional[str], size: int) -> bytes:
+    """
+    Convertit une adresse / un hash hex (ou bytes) en champ binaire de taille fixe.
+    """
+    if not value:
+        return b"\x00" * size
+    if isinstance(value, (bytes, bytearray)):
+        raw = bytes(value)
+    else:
+        text = value[2:] if value.startswith("0x") else value
+        raw = bytes.fromhex(text)
+    return raw[:size].ljust(size, b"\x00")
+
+
+def normalize_label(text: str) -> str:
+    """
+    Normalise une raison pour l'agrégation : les nombres variables
+    (taxes, montants…) sont remplacés par '#', longueur bornée.
+    """
+    text = re.sub(r"\d+(?:[.,]\d+)?", "#", str(text)).strip()
+    return text[:80] or "?"
+
+
+# --- Écriture ---
+class JournalWriter:
+    """
+    Écrivain append-only : buffer mémoire + thread de flush/fsync périodique.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 0.2,
+        fsync_interval: float = 1.0
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self._buf = bytearray()
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._names: Dict[str, int] = {}
+        self._new_names: List[str] = []
+        self._closed = False
+
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        if new_file:
+            os.write(self._fd, MAGIC)
+        self._names_path = path + ".names"
+        self._names_fd = os.open(self._names_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        for idx, name in enumerate(load_names(self._names_path)):
+            self._names[name] = idx
+
+        self._last_fsync = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+        self._thread.start()
+
+    def name_id(self, name: str) -> int:
+        """
+        Retourne l'id interné d'un libellé (créé au premier usage).
+        """
+        idx = self._names.get(name)
+        if idx is None:
+            with self._lock:
+                idx = self._names.get(name)
+                if idx is None:
+                    idx = len(self._names)
+                    self._names[name] = idx
+                    self._new_names.append(name)
+        return idx
+
+    def append(
+        self,
+        kind: int,
+        flag: int = 0,
+        code: int = 0,
+        block: int = 0,
+        a: float = 0.0,
+        b: float = 0.0,
+        token: Optional[str] = None,
+        ref: Optional[str] = None
+    ):
+        rec = RECORD.pack(
+            time.time(), kind, flag, code, block or 0, float(a or 0), float(b or 0),
+            _to_bytes(token, 20) if token else _ADDR_EMPTY,
+            _to_bytes(ref, 32) if ref else _REF_EMPTY
+        )
+        with self._lock:
+            self._buf += rec
+
+    def flush(self, fsync: bool = False):
+        with self._io_lock:
+            with self._lock:
+                data, self._buf = self._buf, bytearray()
+                names, self._new_names = self._new_names, []
+            # Les libellés d'abord : un enregistrement ne référence jamais un id absent
+            if names:
+                os.write(self._names_fd, "".join(n.replace("\n", " ") + "\n" for n in names).encode("utf-8"))
+            if data:
+                os.write(self._fd, data)
+            if fsync:
+                if names:
+                    os.fsync(self._names_fd)
+                os.fsync(self._fd)
+                self._last_fsync = time.monotonic()
+
+    def _run(self):
+        while not self._closed:
+            time.sleep(self.flush_interval)
+            try:
+                due = time.monotonic() - self._last_fsync >= self.fsync_interval
+                self.flush(fsync=due)
+            except Exception as e:
+                print(f"⚠️ Erreur écriture journal : {e}")
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.flush(fsync=True)
+        os.close(self._fd)
+        os.close(self._names_fd)
+
+
+_writer: Optional[JournalWriter] = None
+_writer_failed = False
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> Optional[JournalWriter]:
+    """
+    Instancie paresseusement l'écrivain global (None si JOURNAL_PATH vide
+    ou si l'ouverture a déjà échoué : on ne retente pas à chaque record).
+    """
+    global _writer, _writer_failed
+    if _writer is None and not _writer_failed:
+        # Import tardif : le CLI de requête ne doit pas dépendre de la config
+        # du bot (adresses obligatoires validées à l'import)
+        from config import JOURNAL_PATH, JOURNAL_FLUSH_INTERVAL, JOURNAL_FSYNC_INTERVAL
+        if not JOURNAL_PATH:
+            _writer_failed = True
+            return None
+        with _writer_lock:
+            if _writer is None and not _writer_failed:
+                try:
+                    _writer = JournalWriter(JOURNAL_PATH, JOURNAL_FLUSH_INTERVAL, JOURNAL_FSYNC_INTERVAL)
+                except Exception as e:
+                    _writer_failed = True
+                    print(f"⚠️ Journal désactivé ({JOURNAL_PATH}) : {e}")
+                    return None
+                atexit.register(_writer.close)
+    return _writer
+
+
+def _append(kind: int, label: Optional[str] = None, **fields):
+    """
+    Ajoute un enregistrement ; `label` est interné dans `code`.
+    Le journal ne doit jamais faire tomber le chemin chaud : rien ne lève.
+    """
+    try:
+        w = get_writer()
+        if w:
+            if label is not None:
+                fields["code"] = w.name_id(label)
+            w.append(kind, **fields)
+    except Exception as e:
+        print(f"⚠️ Journal indisponible : {e}")
+
+
+def log_candidate(token: str, pair: str, block: int = 0, reserve0: float = 0, reserve1: float = 0):
+    _append(CANDIDATE, token=token, ref=pair, block=block, a=reserve0, b=reserve1)
+
+
+def log_verdict(token: str, ok: bool, reason: str, pair: Optional[str] = None):
+    _append(VERDICT, label=normalize_label(reason), token=token, ref=pair, flag=int(bool(ok)))
+
+
+def log_stage(name: str, duration: float, token: Optional[str] = None):
+    _append(STAGE, label=name, token=token, a=duration)
+
+
+def log_tx(kind: str, token: str, tx_hash: str, value_wei: int = 0):
+    _append(TX, label=kind, token=token, ref=tx_hash, a=value_wei)
+
+
+def log_fill(kind: str, token: str, tx_hash: str, status: int, block: int, gas_used: int, gas_fee_eth: float):
+    _append(FILL, label=kind, token=token, ref=tx_hash, flag=status,
+            block=block, a=gas_used, b=gas_fee_eth)
+
+
+def log_pnl(token: str, pnl_eth: float, duration: float, trades: int, paper: bool = False):
+    _append(PNL, token=token, a=pnl_eth, b=duration, code=trades, flag=int(bool(paper)))
+
+
+@contextmanager
+def stage(name: str, token: Optional[str] = None):
+    """
+    Chronomètre un bloc et l'enregistre comme étape :
+        with stage("reserves", token): ...
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        log_stage(name, time.perf_counter() - start, token)
+
+
+# --- Lecture ---
+def load_names(path: str) -> List[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [line.rstrip("\n") for line in f]
+    except FileNotFoundError:
+        return []
+
+
+class JournalReader:
+    """
+    Lecteur memory-mapped : les enregistrements sont décodés à la volée
+    via struct.iter_unpack, sans copie du fichier.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.names = load_names(path + ".names")
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < len(MAGIC):
+            self._mm = None
+            self._view = memoryview(b"")
+            return
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} n'est pas un journal valide")
+        # Ignore un éventuel enregistrement partiel en fin de fichier
+        usable = (size - len(MAGIC)) // RECORD_SIZE * RECORD_SIZE
+        self._view = memoryview(self._mm)[len(MAGIC):len(MAGIC) + usable]
+
+    def __len__(self) -> int:
+        return len(self._view) // RECORD_SIZE
+
+    def name(self, idx: int) -> str:
+        return self.names[idx] if idx < len(self.names) else f"#{idx}"
+
+    def _ts_at(self, i: int) -> float:
+        return struct.unpack_from("<d", self._view, i * RECORD_SIZE)[0]
+
+    def _start_index(self, since: Optional[float]) -> int:
+        """
+        Recherche dichotomique du premier enregistrement ≥ since
+        (les horodatages sont croissants dans un journal append-only).
+        """
+        if not since:
+            return 0
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ts_at(mid) < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _slice(self, since: Optional[float]) -> memoryview:
+        return self._view[self._start_index(since) * RECORD_SIZE:]
+
+    def heads(self, since: Optional[float] = None) -> Iterator[Tuple]:
+        """
+        (ts, kind, flag, code, block, a, b) — rapide, sans token/ref.
+        """
+        return RECORD_HEAD.iter_unpack(self._slice(since))
+
+    def records(self, since: Optional[float] = None) -> Iterator[Tuple]:
+        """
+        Enregistrements complets : token et ref sont renvoyés en bytes bruts.
+        """
+        return RECORD.iter_unpack(self._slice(since))
+
+    def close(self):
+        self._view.release()
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+
+# --- Agrégations ---
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def summarize(reader: JournalReader, since: Optional[float] = None) -> Dict[str, int]:
+    counts = {name: 0 for name in KIND_NAMES.values()}
+    for rec in reader.heads(since):
+        name = KIND_NAMES.get(rec[1])
+        if name:
+            counts[name] += 1
+    return counts
+
+
+def reason_stats(reader: JournalReader, since: Optional[float] = None) -> List[Tuple[str, int, int, int, float]]:
+    """
+    Par raison : (raison, verdicts, trades clôturés, trades gagnants, PnL total).
+    Les trades sont rattachés au dernier verdict du même token.
+    """
+    last_reason: Dict[bytes, int] = {}
+    per_reason: Dict[int, List] = {}
+    for ts, kind, flag, code, block, a, b, token, ref in reader.records(since):
+        if kind == VERDICT:
+            last_reason[token] = code
+            per_reason.setdefault(code, [0, 0, 0, 0.0])[0] += 1
+        elif kind == PNL:
+            code_r = last_reason.get(token)
+            if code_r is None:
+                continue
+            st = per_reason[code_r]
+            st[1] += 1
+            st[2] += a > 0
+            st[3] += a
+    rows = [(reader.name(c), *st) for c, st in per_reason.items()]
+    rows.sort(key=lambda r: r[1], reverse=True)
+    return rows
+
+
+def latency_stats(reader: JournalReader, since: Optional[float] = None) -> List[Tuple[str, int, float, float, float]]:
+    """
+    Par étape : (étape, n, p50, p90, p99) en millisecondes.
+    """
+    durations: Dict[int, List[float]] = {}
+    for ts, kind, flag, code, block, a, b in reader.heads(since):
+        if kind == STAGE:
+            durations.setdefault(code, []).append(a)
+    rows = []
+    for code, values in durations.items():
+        values.sort()
+        rows.append((
+            reader.name(code), len(values),
+            percentile(values, 50) * 1000,
+            percentile(values, 90) * 1000,
+            percentile(values, 99) * 1000
+        ))
+    rows.sort(key=lambda r: r[0])
+    return rows
+
+
+def trade_stats(reader: JournalReader, since: Optional[float] = None) -> Dict[str, float]:
+    """
+    Trades réels et paper (simulés) côte à côte.
+    """
+    paper_codes = {i for i, name in enumerate(reader.names) if name.startswith("paper_")}
+    n = [0, 0]
+    wins = [0, 0]
+    pnl = [0.0, 0.0]
+    gas = [0.0, 0.0]
+    tx_sent = fills_ok = 0
+    for ts, kind, flag, code, block, a, b in reader.heads(since):
+        if kind == PNL:
+            n[flag] += 1
+            wins[flag] += a > 0
+            pnl[flag] += a
+        elif kind == FILL:
+            paper = code in paper_codes
+            gas[paper] += b
+            fills_ok += flag == 1 and not paper
+        elif kind == TX:
+            tx_sent += 1
+    return {
+        "trades":          n[0],
+        "win_rate":        (wins[0] / n[0] * 100) if n[0] else 0.0,
+        "pnl_eth":         pnl[0],
+        "gas_eth":         gas[0],
+        "tx_sent":         tx_sent,
+        "fills_ok":        fills_ok,
+        "paper_trades":    n[1],
+        "paper_win_rate":  (wins[1] / n[1] * 100) if n[1] else 0.0,
+        "paper_pnl_eth":   pnl[1],
+        "paper_gas_eth":   gas[1],
+    }
+
+
+def parse_since(value: Optional[str]) -> Optional[float]:
+    """
+    '90m', '24h', '7d' ou un timestamp unix → timestamp absolu.
+    """
+    if not value:
+        return None
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    if value[-1] in units:
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+def main(argv: Optional[List[str]] = None):
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Requêtes sur le journal du sniper")
+    parser.add_argument("command", choices=["summary", "reasons", "latency", "trades"])
+    parser.add_argument("--path", default=os.getenv("JOURNAL_PATH", "journal.bin"))
+    parser.add_argument("--since", help="fenêtre : 90m, 24h, 7d… ou timestamp unix")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    reader = JournalReader(args.path)
+    since = parse_since(args.since)
+
+    if args.command == "summary":
+        for name, count in summarize(reader, since).items():
+            print(f"{name:<10} {count:>10}")
+    elif args.command == "reasons":
+        print(f"{'verdicts':>9} {'trades':>7} {'win%':>6} {'pnl':>10}  raison")
+        for name, verdicts, closed, wins, pnl in reason_stats(reader, since):
+            win = f"{wins / closed * 100:.1f}" if closed else "-"
+            print(f"{verdicts:>9} {closed:>7} {win:>6} {pnl:>10.4f}  {name}")
+    elif args.command == "latency":
+        print(f"{'étape':<20} {'n':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+        for name, n, p50, p90, p99 in latency_stats(reader, since):
+            print(f"{name:<20} {n:>8} {p50:>9.1f} {p90:>9.1f} {p99:>9.1f}")
+    elif args.command == "trades":
+        for k, v in trade_stats(reader, since).items():
+            print(f"{k:<16} {v:>12.4f}" if isinstance(v, float) else f"{k:<16} {v:>12}")
+
+    n = len(reader)
+    reader.close()
+    print(f"\n({n} enregistrements, {time.perf_counter() - start:.3f}s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
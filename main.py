@@ -1,13 +1,11 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-import json
-import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from web3 import Web3
 from web3.middleware import geth_poa_middleware
 
-from token_checker import is_token_safe
 from config import (
     WSS_RPC_URL,
     FACTORY_ADDRESS,
@@ -16,22 +14,26 @@ from config import (
     BUY_AMOUNT,
     TIMEOUT,
     MIN_LIQUIDITY,
-    WALLET_ADDRESS
+    WALLET_ADDRESS,
+    PAPER_TRADING
 )
-from achat import buy_token, monitor_and_sell
+from achat import acquire_wallet, buy_token, monitor_and_sell, wallet_pool
 from telegram_alert import send_telegram_message, notify_error
 from watcher2 import watch_for_pairs, connect_web3
 
-# === Chargement des ABIs depuis le même dossier que ce script ===
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-
-def load_abi(name: str):
-    path = os.path.join(BASE_DIR, f"{name}.json")
-    with open(path, "r") as f:
-        return json.load(f)
+def snipe(token: str, base: str, wallet):
+    """
+    Achat puis surveillance/vente d'une position (exécuté dans un worker),
+    sur le wallet déjà affecté par la boucle principale.
+    """
+    try:
+        amount = buy_token(token, base, wallet=wallet)
+        if amount > 0:
+            monitor_and_sell(token, amount, base)
+    except Exception as e:
+        notify_error(f"Erreur sniping {token}: {e}")
+        wallet_pool.release(token)
 
-ERC20_ABI  = load_abi("erc20_abi")
-ROUTER_ABI = load_abi("router_abi")
 
 # --- Script principal ---
 def main():
@@ -46,13 +48,7 @@ def main():
         w3.middleware_onion.inject(geth_poa_middleware, layer=0)
     assert w3.is_connected(), "Web3 non connecté"
 
-    # 3) Préparer le contrat router
-    router = w3.eth.contract(
-        address=Web3.to_checksum_address(ROUTER_ADDRESS),
-        abi=ROUTER_ABI
-    )
-
-    # 4) Construire le message de démarrage
+    # 3) Construire le message de démarrage
     params = {
         "RPC URL":        WSS_RPC_URL,
         "Factory":        FACTORY_ADDRESS,
@@ -60,13 +56,15 @@ def main():
         "Slippage":       f"{SLIPPAGE}%",
         "Buy Amount":     f"{BUY_AMOUNT} BNB",
         "Min Liquidity":  f"{int(MIN_LIQUIDITY / 1e18)} BNB",
-        "Timeout":        f"{TIMEOUT}s"
+        "Timeout":        f"{TIMEOUT}s",
+        "Wallets":        len(wallet_pool),
+        "Mode":           "PAPER (fills simulés)" if PAPER_TRADING else "Réel"
     }
     lines = ["🤖 *Sniper BSC Bot démarré!*", "*Paramètres de la session :*"]
     for k, v in params.items():
         lines.append(f"• *{k}* : `{v}`")
 
-    # 5) Ajouter le solde du wallet
+    # 4) Ajouter le solde du wallet
     try:
         balance_wei = w3.eth.get_balance(WALLET_ADDRESS)
         balance_bnb = Web3.from_wei(balance_wei, 'ether')
@@ -76,19 +74,22 @@ def main():
 
     startup_msg = "\n".join(lines)
 
-    # 6) Envoi Telegram + affichage console
+    # 5) Envoi Telegram + affichage console
     try:
         send_telegram_message(startup_msg)
     except Exception as e:
         print(f"⚠️ Erreur envoi Telegram : {e}")
     print("\n" + startup_msg.replace("*", "").replace("`", ""))
 
-    # 7) Boucle principale : détection → achat → vente
-    is_sniping = False
+    # 6) Boucle principale : détection → achat → vente
+    #    watch_for_pairs ne yield que des tokens déjà passés par is_token_safe
+    #    (ou clones d'un template sûr connu) : pas de seconde vérification ici.
+    #    Une position par wallet du pool, exécutées en parallèle
+    executor = ThreadPoolExecutor(max_workers=len(wallet_pool), thread_name_prefix="snipe")
     try:
         for info in watch_for_pairs():
-            if is_sniping:
-                print("⏳ Sniping en cours, nouvel événement ignoré pour base ")
+            if not wallet_pool.has_capacity():
+                print("⏳ Tous les wallets sont en position, nouvel événement ignoré pour base ")
                 continue
 
             token = info["token"]
@@ -96,23 +97,20 @@ def main():
             pair  = info["pair"]
             print(f"📝 Nouvelle paire détectée → Token: {token} | Base: {base} | Pair: {pair}")
 
-            # 7.1) Anti-scam
-            safe, reason = is_token_safe(
-                w3, router, token, base, WALLET_ADDRESS, ERC20_ABI
-            )
-            if not safe:
-                notify_error(f"Token bloqué pour base : {reason}")
+            # 6.1) Affectation du wallet avant soumission : un worker ne part
+            #      jamais sans wallet disponible
+            wallet = acquire_wallet(token)
+            if wallet is None:
+                print(f"⏳ Aucun wallet disponible, paire ignorée : {token}")
                 continue
 
-            # 7.2) Lancement du sniping
-            is_sniping = True
-            amount = buy_token(token, base)
-            if amount > 0:
-                monitor_and_sell(token, base, amount)
-            is_sniping = False
+            # 6.2) Lancement du sniping sur ce wallet
+            executor.submit(snipe, token, base, wallet)
 
     except Exception as e:
         notify_error(str(e))
+    finally:
+        executor.shutdown(wait=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,699 @@
+"""
+Noeud JSON-RPC Ethereum simulé, pour les benchmarks et les tests de charge.
+
+Implémente le sous-ensemble de méthodes utilisé par le bot (blocs, logs,
+filtres, eth_call sur factory/pair/router/ERC20, envoi de TX et receipts)
+avec, par méthode, une latence, une gigue et un taux d'échec configurables.
+Peut générer des « tempêtes » de PairCreated (ex. 200 paires dans un bloc).
+
+Sert aussi GET /api (réponse type BscScan getsourcecode) pour que
+is_verified_contract() ne sorte pas du réseau local.
+
+Usage CLI :
+    python mock_node.py --port 8545 --block-time 2 --latency eth_call=20:5:0.01
+    # puis, dans un autre terminal :
+    curl -d '{"jsonrpc":"2.0","id":1,"method":"mock_storm","params":[200]}' localhost:8545
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import rlp
+from eth_account import Account
+from eth_utils import keccak
+
+# --- Constantes ABI ---
+PAIR_CREATED_TOPIC = "0x0d3648bd0f6ba80134a33ba9275ac585d9d315f0ad8355cddefde31afa28d0e9"
+
+SEL_GET_RESERVES    = "0x0902f1ac"
+SEL_GET_AMOUNTS_OUT = "0xd06ca61f"
+SEL_BALANCE_OF      = "0x70a08231"
+SEL_DECIMALS        = "0x313ce567"
+SEL_APPROVE         = "0x095ea7b3"
+SEL_ALLOWANCE       = "0xdd62ed3e"
+SEL_SWAP_ETH_FOR_TOKENS   = "0xb6f9de95"
+SEL_SWAP_TOKENS_FOR_ETH   = "0x791ac947"
+SEL_SWAP_TOKENS_FOR_TOKENS = "0x5c11d795"
+SELL_SELECTORS = (SEL_SWAP_TOKENS_FOR_ETH, SEL_SWAP_TOKENS_FOR_TOKENS)
+
+# Disposition de stockage des tokens simulés (OpenZeppelin ERC20) : les
+# stateOverride d'eth_call sont lus à ces emplacements
+BALANCE_SLOT   = 0
+ALLOWANCE_SLOT = 1
+
+# WETH.withdraw() : le router convertit la sortie d'une vente en ETH natif
+WITHDRAWAL_TOPIC = "0x7fcf532c15f0a6db0bd6d0e038bea71d30d808c7d98cb3bf7268a95bf5081b65"
+
+DEFAULT_FACTORY = "0x8909dc15e40173ff4699343b6eb8132c65e18ec6"
+DEFAULT_ROUTER  = "0x4752ba5dbc23f44d87826276bf6fd6b1c372ad24"
+DEFAULT_WETH    = "0x4200000000000000000000000000000000000006"
+
+# Bytecode runtime factice renvoyé par eth_getCode : un template sain et un
+# template honeypot, avec l'adresse du token en PUSH20 et des métadonnées
+# solc propres à chaque déploiement (comme de vrais clones)
+TOKEN_TEMPLATE    = "6080604052348015600f57600080fd5b50" + "60" * 64
+HONEYPOT_TEMPLATE = "6080604052348015600f57600080fd5b50" + "61" * 64
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _word(value: int) -> str:
+    return f"{value:064x}"
+
+
+def _addr_word(addr: str) -> str:
+    return addr.lower().replace("0x", "").rjust(64, "0")
+
+
+def _hex(value: int) -> str:
+    return hex(value)
+
+
+def _mapping_key(key: str, slot) -> bytes:
+    """
+    Emplacement Solidity de mapping[key] : keccak(pad32(key) . pad32(slot)).
+    """
+    slot = slot if isinstance(slot, bytes) else slot.to_bytes(32, "big")
+    return keccak(bytes.fromhex(key.replace("0x", "").rjust(64, "0")) + slot)
+
+
+def _to_int(value) -> int:
+    if not value:
+        return 0
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+class MockNode:
+    """
+    État de la chaîne simulée. Thread-safe : le serveur HTTP est multi-thread.
+
+    latency : {"méthode": (latence_ms, gigue_ms, taux_échec)}, clé "default"
+    pour toutes les autres méthodes.
+    """
+
+    def __init__(
+        self,
+        block_time: float = 2.0,
+        chain_id: int = 8453,
+        factory: str = DEFAULT_FACTORY,
+        router: str = DEFAULT_ROUTER,
+        weth: str = DEFAULT_WETH,
+        latency: Optional[Dict[str, Tuple[float, float, float]]] = None,
+        honeypot_ratio: float = 0.0,
+        max_log_range: int = 0,
+        filter_loss_rate: float = 0.0,
+        reserve: int = 50 * 10**18,
+        token_tax: float = 0.0,
+        seed: int = 42
+    ):
+        self.block_time = block_time
+        self.chain_id = chain_id
+        self.factory = factory.lower()
+        self.router = router.lower()
+        self.weth = weth.lower()
+        self.latency = dict(latency or {})
+        self.honeypot_ratio = honeypot_ratio
+        self.max_log_range = max_log_range
+        self.filter_loss_rate = filter_loss_rate
+        self.reserve = reserve
+        self.token_tax = token_tax
+        self.rng = random.Random(seed)
+
+        self.lock = threading.RLock()
+        self.genesis_time = time.time() - 1000 * block_time
+        self.head = 1000
+        self.block_times: Dict[int, float] = {}
+        self.logs: Dict[int, List[dict]] = {}
+        self.block_txs: Dict[int, List[str]] = {}
+        self.pending: List[str] = []
+        self.receipts: Dict[str, dict] = {}
+        self.tx_results: Dict[str, Tuple[int, List[dict]]] = {}
+        # État persisté par les TX envoyées (jamais par eth_call)
+        self.holdings: Counter = Counter()            # (token, owner) → solde
+        self.allowances: Dict[Tuple[str, str, str], int] = {}  # (token, owner, spender)
+        self.tx_count = 0
+        self.filters: Dict[str, tuple] = {}
+        self.honeypots = set()
+        self.pairs: Dict[str, str] = {}
+        self.n_pairs = 0
+        self.n_filters = 0
+
+        # Métriques
+        self.calls: Counter = Counter()
+        self.failures: Counter = Counter()
+        self.sent_at: List[float] = []
+        self.storm_at: Optional[float] = None
+
+        self._stop = threading.Event()
+        self._miner: Optional[threading.Thread] = None
+
+    # --- Chaîne ---
+    def start_mining(self):
+        if self.block_time > 0 and self._miner is None:
+            self._miner = threading.Thread(target=self._mine_loop, name="mock-miner", daemon=True)
+            self._miner.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _mine_loop(self):
+        while not self._stop.wait(self.block_time):
+            self.mine()
+
+    def mine(self, logs: Optional[List[dict]] = None) -> int:
+        """
+        Produit un bloc contenant les TX en attente et les `logs` fournis.
+        """
+        with self.lock:
+            self.head += 1
+            num = self.head
+            now = time.time()
+            self.block_times[num] = now
+            txs, self.pending = self.pending, []
+            self.block_txs[num] = txs
+            for i, txh in enumerate(txs):
+                self.receipts[txh] = self._receipt(txh, num, i)
+            if logs:
+                for i, log in enumerate(logs):
+                    log.update({
+                        "blockNumber": _hex(num),
+                        "blockHash": self._block_hash(num),
+                        "logIndex": _hex(i),
+                        "transactionIndex": "0x0",
+                        "transactionHash": "0x" + hashlib.sha256(f"log{num}:{i}".encode()).hexdigest(),
+                        "removed": False,
+                    })
+                self.logs[num] = logs
+            return num
+
+    def storm(self, n_pairs: int) -> int:
+        """
+        Mine immédiatement un bloc contenant `n_pairs` événements PairCreated.
+        """
+        logs = []
+        with self.lock:
+            for _ in range(n_pairs):
+                self.n_pairs += 1
+                token = "0x" + f"{0xbe000000 + self.n_pairs:040x}"
+                pair  = "0x" + f"{0xfa000000 + self.n_pairs:040x}"
+                self.pairs[pair] = token
+                if self.rng.random() < self.honeypot_ratio:
+                    self.honeypots.add(token)
+                t0, t1 = sorted([token, self.weth])
+                logs.append({
+                    "address": self.factory,
+                    "topics": [PAIR_CREATED_TOPIC, "0x" + _addr_word(t0), "0x" + _addr_word(t1)],
+                    "data": "0x" + _addr_word(pair) + _word(self.n_pairs),
+                })
+            num = self.mine(logs)
+            self.storm_at = self.block_times[num]
+        return num
+
+    def _block_hash(self, num: int) -> str:
+        return "0x" + hashlib.sha256(f"block{num}".encode()).hexdigest()
+
+    def _block_time(self, num: int) -> float:
+        return self.block_times.get(num, self.genesis_time + num * max(self.block_time, 1e-3))
+
+    def _block(self, num: int) -> dict:
+        return {
+            "number": _hex(num),
+            "hash": self._block_hash(num),
+            "parentHash": self._block_hash(num - 1),
+            "timestamp": _hex(int(self._block_time(num))),
+            "baseFeePerGas": _hex(10**8),
+            "gasLimit": _hex(30_000_000),
+            "gasUsed": _hex(0),
+            "miner": "0x" + "00" * 20,
+            "extraData": "0x",
+            "difficulty": "0x0",
+            "totalDifficulty": "0x0",
+            "nonce": "0x0000000000000000",
+            "sha3Uncles": "0x" + "00" * 32,
+            "logsBloom": "0x" + "00" * 256,
+            "transactionsRoot": "0x" + "00" * 32,
+            "stateRoot": "0x" + "00" * 32,
+            "receiptsRoot": "0x" + "00" * 32,
+            "mixHash": "0x" + "00" * 32,
+            "size": "0x0",
+            "transactions": list(self.block_txs.get(num, [])),
+            "uncles": [],
+        }
+
+    def _receipt(self, txh: str, num: int, index: int) -> dict:
+        status, logs = self.tx_results.pop(txh, (1, []))
+        for i, log in enumerate(logs):
+            log.update({
+                "blockNumber": _hex(num),
+                "blockHash": self._block_hash(num),
+                "logIndex": _hex(i),
+                "transactionIndex": _hex(index),
+                "transactionHash": txh,
+                "removed": False,
+            })
+        return {
+            "transactionHash": txh,
+            "transactionIndex": _hex(index),
+            "blockNumber": _hex(num),
+            "blockHash": self._block_hash(num),
+            "from": "0x" + "00" * 20,
+            "to": self.router,
+            "cumulativeGasUsed": _hex(150_000 * (index + 1)),
+            "gasUsed": _hex(150_000),
+            "effectiveGasPrice": _hex(2 * 10**8),
+            "contractAddress": None,
+            "logs": logs,
+            "logsBloom": "0x" + "00" * 256,
+            "status": _hex(status),
+            "type": "0x2",
+        }
+
+    def _resolve_block(self, tag) -> int:
+        if tag in (None, "latest", "pending", "safe", "finalized"):
+            return self.head
+        if tag == "earliest":
+            return 0
+        return int(tag, 16) if isinstance(tag, str) else int(tag)
+
+    def _match_logs(self, from_block: int, to_block: int, address=None, topics=None) -> List[dict]:
+        addrs = None
+        if address:
+            addrs = {a.lower() for a in (address if isinstance(address, list) else [address])}
+        topic0 = None
+        if topics and topics[0]:
+            topic0 = topics[0] if isinstance(topics[0], list) else [topics[0]]
+        out = []
+        for num in range(from_block, to_block + 1):
+            for log in self.logs.get(num, ()):
+                if addrs and log["address"] not in addrs:
+                    continue
+                if topic0 and log["topics"][0] not in topic0:
+                    continue
+                out.append(dict(log))
+        return out
+
+    # --- Contrats ---
+    @staticmethod
+    def _override(overrides: dict, contract: str, key: bytes) -> Optional[int]:
+        """
+        Valeur d'un slot fournie par le stateOverride d'eth_call, si présente.
+        """
+        for addr, params in overrides.items():
+            if addr.lower() != contract:
+                continue
+            slots = {k.lower(): v for k, v in (params.get("stateDiff") or params.get("state") or {}).items()}
+            value = slots.get("0x" + key.hex())
+            return None if value is None else int(value, 16)
+        return None
+
+    def _balance(self, token: str, owner: str, overrides: dict) -> int:
+        value = self._override(overrides, token, _mapping_key(owner, BALANCE_SLOT))
+        return self.holdings[(token, owner)] if value is None else value
+
+    def _allowance(self, token: str, owner: str, spender: str, overrides: dict) -> int:
+        key = _mapping_key(spender, _mapping_key(owner, ALLOWANCE_SLOT))
+        value = self._override(overrides, token, key)
+        return self.allowances.get((token, owner, spender), 0) if value is None else value
+
+    def _eth_call(self, tx: dict, overrides: Optional[dict] = None) -> str:
+        overrides = overrides or {}
+        to = (tx.get("to") or "").lower()
+        sender = (tx.get("from") or "0x" + "00" * 20).lower()
+        data = tx.get("data") or tx.get("input") or "0x"
+        sel, args = data[:10], data[10:]
+
+        if sel == SEL_GET_RESERVES:
+            return "0x" + _word(self.reserve) + _word(self.reserve) + _word(int(time.time()))
+        if sel == SEL_DECIMALS:
+            return "0x" + _word(18)
+        if sel == SEL_BALANCE_OF:
+            # Comme un vrai noeud : un achat simulé par eth_call ne crédite rien
+            return "0x" + _word(self._balance(to, "0x" + args[24:64], overrides))
+        if sel == SEL_ALLOWANCE:
+            return "0x" + _word(self._allowance(to, "0x" + args[24:64], "0x" + args[88:128], overrides))
+        if sel == SEL_APPROVE:
+            return "0x" + _word(1)
+        if sel == SEL_GET_AMOUNTS_OUT:
+            amount_in = int(args[0:64], 16)
+            path = self._path(args, 1)
+            return "0x" + _word(32) + _word(len(path)) + "".join(_word(a) for a in self._amounts_out(amount_in, path))
+        if sel in SELL_SELECTORS:
+            path, received = self._swap_tokens_output(args)
+            self._check_pull(path[0], sender, int(args[0:64], 16), overrides)
+            self._check_output(received, int(args[64:128], 16))
+            return "0x"
+        if sel == SEL_SWAP_ETH_FOR_TOKENS:
+            # swapExactETHForTokens…(amountOutMin, path, to, deadline), value = entrée
+            path = self._path(args, 1)
+            amount_in = _to_int(tx.get("value"))
+            # Achat : la taxe est prélevée sur les tokens sortant de la paire
+            received = int(self._amounts_out(amount_in, path)[-1] * (1 - self.token_tax))
+            self._check_output(received, int(args[0:64], 16))
+            return "0x"
+        raise RpcError(3, f"execution reverted (selector inconnu {sel} sur {to})")
+
+    def _swap_tokens_output(self, args: str) -> Tuple[List[str], int]:
+        """
+        swapExactTokensFor*(amountIn, amountOutMin, path, to, deadline) :
+        (path, montant reçu), revert si honeypot.
+        """
+        path = self._path(args, 2)
+        if path[0] in self.honeypots:
+            raise RpcError(3, "execution reverted: TRANSFER_FAILED")
+        amount_in = int(args[0:64], 16)
+        if path[0] in self.pairs.values():
+            # Vente : la taxe est prélevée sur les tokens envoyés à la paire
+            return path, self._amounts_out(int(amount_in * (1 - self.token_tax)), path)[-1]
+        return path, int(self._amounts_out(amount_in, path)[-1] * (1 - self.token_tax))
+
+    def _check_pull(self, token: str, owner: str, amount: int, overrides: dict):
+        """
+        transferFrom(owner → paire) du router : solde et allowance requis.
+        """
+        if (self._balance(token, owner, overrides) < amount
+                or self._allowance(token, owner, self.router, overrides) < amount):
+            raise RpcError(3, "execution reverted: TransferHelper: TRANSFER_FROM_FAILED")
+
+    def _execute(self, raw: str) -> Tuple[int, List[dict]]:
+        """
+        Applique une TX envoyée (approve, achat, vente) à l'état persisté et
+        retourne (status, logs). Les ventes produisent le Withdrawal WETH du
+        montant versé en ETH au wallet.
+        """
+        data = bytes.fromhex(raw[2:])
+        if data[0] < 0x7f:
+            # EIP-2718 : [chainId, nonce, tip, maxFee, gas, to, value, data, …]
+            fields = rlp.decode(data[1:])
+            to, value, calldata = fields[5], fields[6], fields[7]
+        else:
+            # Legacy : [nonce, gasPrice, gas, to, value, data, v, r, s]
+            fields = rlp.decode(data)
+            to, value, calldata = fields[3], fields[4], fields[5]
+        to, calldata = "0x" + to.hex(), calldata.hex()
+        sel, args = "0x" + calldata[:8], calldata[8:]
+        sender = Account.recover_transaction(raw).lower()
+
+        if sel == SEL_APPROVE:
+            self.allowances[(to, sender, "0x" + args[24:64])] = int(args[64:128], 16)
+            return 1, []
+        if to != self.router:
+            return 1, []
+        try:
+            if sel == SEL_SWAP_ETH_FOR_TOKENS:
+                path = self._path(args, 1)
+                received = int(self._amounts_out(int.from_bytes(value, "big"), path)[-1] * (1 - self.token_tax))
+                self._check_output(received, int(args[0:64], 16))
+                self.holdings[(path[-1], "0x" + args[152:192])] += received
+                return 1, []
+            if sel not in SELL_SELECTORS:
+                return 1, []
+            path, received = self._swap_tokens_output(args)
+            amount_in = int(args[0:64], 16)
+            self._check_pull(path[0], sender, amount_in, {})
+            self._check_output(received, int(args[64:128], 16))
+        except RpcError:
+            return 0, []
+        self.holdings[(path[0], sender)] -= amount_in
+        self.allowances[(path[0], sender, self.router)] -= amount_in
+        if sel != SEL_SWAP_TOKENS_FOR_ETH:
+            self.holdings[(path[-1], "0x" + args[216:256])] += received
+            return 1, []
+        return 1, [{
+            "address": self.weth,
+            "topics": [WITHDRAWAL_TOPIC, "0x" + _addr_word(self.router)],
+            "data": "0x" + _word(received),
+        }]
+
+    @staticmethod
+    def _path(args: str, index: int) -> List[str]:
+        """
+        Tableau d'adresses `path` dont l'offset est le `index`-ième argument.
+        """
+        offset = int(args[index * 64:(index + 1) * 64], 16) * 2
+        n = int(args[offset:offset + 64], 16)
+        return ["0x" + args[offset + 64 + i * 64 + 24:offset + 128 + i * 64] for i in range(n)]
+
+    @staticmethod
+    def _check_output(received: int, min_out: int):
+        if received < min_out:
+            raise RpcError(3, "execution reverted: UniswapV2Router: INSUFFICIENT_OUTPUT_AMOUNT")
+
+    def _amounts_out(self, amount_in: int, path: List[str]) -> List[int]:
+        """
+        Prix x*y=k sur réserves égales. Comme le vrai getAmountsOut, ignore
+        la taxe de transfert du token (appliquée par les swaps simulés).
+        """
+        amounts = [amount_in]
+        for _ in path[1:]:
+            a = amounts[-1] * 997
+            out = a * self.reserve // (self.reserve * 1000 + a)
+            amounts.append(out)
+        return amounts
+
+    # --- Dispatch RPC ---
+    def handle(self, method: str, params: list):
+        spec = self.latency.get(method, self.latency.get("default", (0, 0, 0)))
+        lat_ms, jitter_ms, fail_rate = spec
+        delay = max(0.0, lat_ms + self.rng.uniform(-jitter_ms, jitter_ms)) / 1000
+        if delay:
+            time.sleep(delay)
+
+        with self.lock:
+            self.calls[method] += 1
+            if fail_rate and self.rng.random() < fail_rate:
+                self.failures[method] += 1
+                raise RpcError(-32000, f"mock: échec injecté sur {method}")
+            fn = getattr(self, "rpc_" + method, None)
+            if fn is None:
+                raise RpcError(-32601, f"the method {method} does not exist/is not available")
+            return fn(*params)
+
+    def rpc_web3_clientVersion(self):
+        return "MockNode/v1.0"
+
+    def rpc_net_version(self):
+        return str(self.chain_id)
+
+    def rpc_eth_chainId(self):
+        return _hex(self.chain_id)
+
+    def rpc_eth_blockNumber(self):
+        return _hex(self.head)
+
+    def rpc_eth_getBlockByNumber(self, tag, full=False):
+        num = self._resolve_block(tag)
+        return self._block(num) if num <= self.head else None
+
+    def rpc_eth_gasPrice(self):
+        return _hex(2 * 10**8)
+
+    def rpc_eth_maxPriorityFeePerGas(self):
+        return _hex(10**8)
+
+    def rpc_eth_getBalance(self, addr, tag="latest"):
+        return _hex(100 * 10**18)
+
+    def rpc_eth_getCode(self, addr, tag="latest"):
+        addr = addr.lower()
+        if addr not in self.pairs.values():
+            return "0x"
+        template = HONEYPOT_TEMPLATE if addr in self.honeypots else TOKEN_TEMPLATE
+        meta_hash = "1220" + hashlib.sha256(addr.encode()).hexdigest()   # multihash IPFS, 34 octets
+        # a2 64 'ipfs' 58 22 <34 octets> 64 'solc' 43 <3 octets> + longueur 0x0033
+        metadata = "a264697066735822" + meta_hash + "64736f6c6343000814" + "0033"
+        return "0x73" + addr[2:] + "50" + template + metadata
+
+    def rpc_eth_getTransactionCount(self, addr, tag="latest"):
+        # Sans décoder les TX on ne connaît pas l'émetteur : nonce global
+        return _hex(self.tx_count)
+
+    def rpc_eth_estimateGas(self, tx, tag=None):
+        if (tx.get("data") or tx.get("input") or "0x")[:10] in SELL_SELECTORS:
+            self._eth_call(tx)
+        return _hex(200_000)
+
+    def rpc_eth_call(self, tx, tag="latest", overrides=None):
+        return self._eth_call(tx, overrides)
+
+    def rpc_eth_sendRawTransaction(self, raw):
+        txh = "0x" + hashlib.sha256(bytes.fromhex(raw[2:])).hexdigest()
+        self.tx_results[txh] = self._execute(raw)
+        self.pending.append(txh)
+        self.sent_at.append(time.time())
+        self.tx_count += 1
+        if self.block_time <= 0:
+            self.mine()
+        return txh
+
+    def rpc_eth_getTransactionReceipt(self, txh):
+        return self.receipts.get(txh)
+
+    def rpc_eth_getTransactionByHash(self, txh):
+        return None
+
+    def rpc_eth_getLogs(self, flt):
+        from_block = self._resolve_block(flt.get("fromBlock"))
+        to_block = self._resolve_block(flt.get("toBlock"))
+        if self.max_log_range and to_block - from_block + 1 > self.max_log_range:
+            raise RpcError(-32005, f"block range too large (max {self.max_log_range})")
+        return self._match_logs(from_block, to_block, flt.get("address"), flt.get("topics"))
+
+    def rpc_eth_newFilter(self, flt):
+        self.n_filters += 1
+        fid = _hex(self.n_filters)
+        self.filters[fid] = (self.head, flt.get("address"), flt.get("topics"))
+        return fid
+
+    def rpc_eth_getFilterChanges(self, fid):
+        if fid not in self.filters or (self.filter_loss_rate and self.rng.random() < self.filter_loss_rate):
+            self.filters.pop(fid, None)
+            raise RpcError(-32000, "filter not found")
+        cursor, address, topics = self.filters[fid]
+        self.filters[fid] = (self.head, address, topics)
+        return self._match_logs(cursor + 1, self.head, address, topics)
+
+    def rpc_eth_uninstallFilter(self, fid):
+        return self.filters.pop(fid, None) is not None
+
+    def rpc_bscscan_getsourcecode(self):
+        # Pseudo-méthode : porte la latence / les échecs de l'endpoint GET /api
+        return None
+
+    # --- Méthodes de contrôle ---
+    def rpc_mock_storm(self, n_pairs=200):
+        return _hex(self.storm(int(n_pairs)))
+
+    def rpc_mock_mine(self):
+        return _hex(self.mine())
+
+    def rpc_mock_stats(self):
+        return {"calls": dict(self.calls), "failures": dict(self.failures), "head": self.head}
+
+    # --- Métriques ---
+    def total_calls(self) -> int:
+        with self.lock:
+            return sum(self.calls.values())
+
+    def reset_stats(self):
+        with self.lock:
+            self.calls.clear()
+            self.failures.clear()
+            self.sent_at.clear()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    node: MockNode = None
+    protocol_version = "HTTP/1.1"
+    # En-têtes et corps sont écrits séparément : sans ça, Nagle + ACK différé = +40ms/appel
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, payload, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _one(self, req: dict) -> dict:
+        resp = {"jsonrpc": "2.0", "id": req.get("id")}
+        try:
+            resp["result"] = self.node.handle(req.get("method"), req.get("params") or [])
+        except RpcError as e:
+            resp["error"] = {"code": e.code, "message": e.message}
+        except Exception as e:
+            resp["error"] = {"code": -32603, "message": f"mock: {e}"}
+        return resp
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            req = json.loads(self.rfile.read(length))
+        except ValueError:
+            return self._reply({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "parse error"}})
+        if isinstance(req, list):
+            return self._reply([self._one(r) for r in req])
+        self._reply(self._one(req))
+
+    def do_GET(self):
+        # Imitation BscScan getsourcecode : tous les contrats sont « vérifiés »
+        if self.path.startswith("/api"):
+            try:
+                self.node.handle("bscscan_getsourcecode", [])
+            except RpcError:
+                return self._reply({"status": "0", "message": "NOTOK", "result": "rate limited"})
+            except Exception:
+                pass
+            return self._reply({"status": "1", "message": "OK", "result": [{"SourceCode": "contract Mock {}"}]})
+        self._reply({"error": "not found"}, status=404)
+
+
+def serve(node: MockNode, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Lance le serveur dans un thread de fond. Retourne (serveur, url).
+    """
+    handler = type("MockHandler", (_Handler,), {"node": node})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-rpc", daemon=True).start()
+    node.start_mining()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def parse_latency(specs: List[str]) -> Dict[str, Tuple[float, float, float]]:
+    """
+    ["eth_call=20:5:0.01", "default=10"] → {méthode: (latence_ms, gigue_ms, taux_échec)}
+    """
+    out = {}
+    for spec in specs or []:
+        method, _, values = spec.partition("=")
+        parts = [float(v) for v in values.split(":")] + [0.0, 0.0]
+        out[method] = (parts[0], parts[1], parts[2])
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Noeud JSON-RPC simulé")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--block-time", type=float, default=2.0)
+    parser.add_argument("--latency", action="append", default=[],
+                        help="méthode=latence_ms:gigue_ms:taux_échec (répétable, 'default' pour toutes)")
+    parser.add_argument("--honeypot-ratio", type=float, default=0.0)
+    parser.add_argument("--max-log-range", type=int, default=0)
+    parser.add_argument("--filter-loss-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    node = MockNode(
+        block_time=args.block_time,
+        latency=parse_latency(args.latency),
+        honeypot_ratio=args.honeypot_ratio,
+        max_log_range=args.max_log_range,
+        filter_loss_rate=args.filter_loss_rate
+    )
+    server, url = serve(node, args.host, args.port)
+    print(f"🧪 Noeud simulé sur {url} (bloc {args.block_time}s)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        node.stop()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Mode paper trading : le pipeline de détection tourne en réel, mais
+buy_token / sell_token sont remplacés par un simulateur de fills.
+
+Chaque fill est pricé au bloc où la vraie TX aurait atterri : le
+simulateur attend la latence de soumission observée en mode réel (étapes
+"buy_submit" + "buy_inclusion" du journal, p50), puis quote via
+getAmountsOut à ce bloc précis, soit l'état après les snipers concurrents
+du même bloc. Les taxes de transfert à l'achat et à la vente, mesurées
+pendant cette attente (token_checker.measure_taxes ; les frais AMM sont déjà
+dans le quote), et un coût de gas estimé sont déduits. Le PnL « would-be » est journalisé avec le flag paper, à
+côté des métriques du mode réel.
+"""
+import os
+import threading
+import time
+from decimal import Decimal
+from typing import Callable, Dict, Optional, Tuple
+
+from web3 import Web3
+
+from config import JOURNAL_PATH, PAPER_SUBMIT_LATENCY, PAPER_GAS_UNITS
+from journal import JournalReader, latency_stats, log_fill, log_pnl
+
+def observed_submission_latency(journal_path: str = JOURNAL_PATH, default: float = PAPER_SUBMIT_LATENCY) -> float:
+    """
+    Latence décision → inclusion observée en mode réel (p50 du journal),
+    `default` si le journal ne contient pas encore d'achats réels.
+    """
+    if not journal_path or not os.path.exists(journal_path):
+        return default
+    try:
+        reader = JournalReader(journal_path)
+        stats = {name: p50 for name, n, p50, p90, p99 in latency_stats(reader)}
+        reader.close()
+    except Exception as e:
+        print(f"⚠️ Lecture latence journal impossible: {e}")
+        return default
+    if "buy_inclusion" not in stats:
+        return default
+    return (stats.get("buy_submit", 0.0) + stats["buy_inclusion"]) / 1000
+
+
+def leg_tax(tax_pct: Optional[float]) -> float:
+    """
+    Taxe de transfert d'une jambe (%, mesurée par measure_taxes) en fraction.
+    """
+    if not tax_pct:
+        return 0.0
+    return min(1.0, max(0.0, tax_pct / 100))
+
+
+class FillSimulator:
+    """
+    Positions et fills simulés, thread-safe (un worker par position).
+    """
+
+    def __init__(self, web3: Web3, router, latency: Optional[float] = None):
+        self.web3 = web3
+        self.router = router
+        self.latency = observed_submission_latency() if latency is None else latency
+        self.positions: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        print(f"📝 Paper trading : latence de soumission simulée {self.latency:.2f}s")
+
+    def _landing_block(self, since: Optional[float] = None) -> int:
+        """
+        Attend la latence observée, comptée depuis `since` (time.monotonic)
+        s'il est fourni : le bloc courant est alors celui où la vraie TX
+        aurait été incluse.
+        """
+        elapsed = time.monotonic() - since if since is not None else 0.0
+        time.sleep(max(0.0, self.latency - elapsed))
+        return self.web3.eth.block_number
+
+    def _fill(self, kind: str, token: str, amount_in: int, path: list, tax: float,
+              since: Optional[float] = None):
+        block = self._landing_block(since)
+        out = self.router.functions.getAmountsOut(amount_in, path).call(block_identifier=block)[-1]
+        out = int(out * (1 - tax))
+
+        blk      = self.web3.eth.get_block(block)
+        base_fee = blk.get('baseFeePerGas', self.web3.to_wei(5, 'gwei'))
+        gas_wei  = PAPER_GAS_UNITS * (base_fee + self.web3.to_wei(2, 'gwei'))
+
+        log_fill(kind, token, None, 1, block, PAPER_GAS_UNITS, float(self.web3.from_wei(gas_wei, 'ether')))
+        return out, gas_wei, block
+
+    def buy(
+        self,
+        token: str,
+        base: str,
+        amount_in_wei: int,
+        measure_taxes: Optional[Callable[[], Tuple[Optional[float], Optional[float]]]] = None
+    ) -> int:
+        """
+        Achat simulé. Retourne la quantité de tokens (unités brutes).
+        `measure_taxes()` donne les taxes (achat, vente) en % ; appelé dans
+        la latence simulée, il ne retarde pas le bloc d'atterrissage.
+        """
+        token, base = Web3.to_checksum_address(token), Web3.to_checksum_address(base)
+        started = time.monotonic()
+        buy_tax_pct, sell_tax_pct = measure_taxes() if measure_taxes else (None, None)
+        buy_tax, sell_tax = leg_tax(buy_tax_pct), leg_tax(sell_tax_pct)
+        out, gas_wei, block = self._fill("paper_buy", token, amount_in_wei, [base, token], buy_tax, started)
+        with self._lock:
+            self.positions[token] = {
+                "amount":   out,
+                "cost_wei": amount_in_wei,
+                "proceeds": 0,
+                "gas_wei":  gas_wei,
+                "sell_tax": sell_tax,
+            }
+        print(f"📝 [PAPER] Achat {token} au bloc {block}: {out} unités (taxe {buy_tax * 100:.1f}%)")
+        return out
+
+    def sell(self, token: str, base: str, fraction: float) -> int:
+        """
+        Vente simulée de `fraction` du reste de la position. Retourne les wei reçus.
+        """
+        token, base = Web3.to_checksum_address(token), Web3.to_checksum_address(base)
+        with self._lock:
+            pos = self.positions.get(token)
+            if not pos:
+                raise ValueError(f"aucune position paper sur {token}")
+            amount = int(pos["amount"] * fraction)
+        if amount <= 0:
+            return 0
+        # Taxe de vente prélevée sur les tokens envoyés à la paire
+        net_in = int(amount * (1 - pos["sell_tax"]))
+        out, gas_wei, block = self._fill("paper_sell", token, net_in, [token, base], 0.0)
+        with self._lock:
+            pos["amount"]   -= amount
+            pos["proceeds"] += out
+            pos["gas_wei"]  += gas_wei
+        print(f"📝 [PAPER] Vente {fraction:.0%} de {token} au bloc {block}: {self.web3.from_wei(out, 'ether')} ETH")
+        return out
+
+    def close(self, token: str, duration: float, trades: int) -> Decimal:
+        """
+        Clôt la position et journalise le PnL would-be (ETH, gas inclus).
+        """
+        with self._lock:
+            pos = self.positions.pop(Web3.to_checksum_address(token), None)
+        if not pos:
+            return Decimal(0)
+        pnl = Decimal(pos["proceeds"] - pos["cost_wei"] - pos["gas_wei"]) / Decimal(10**18)
+        log_pnl(token, float(pnl), duration, trades, paper=True)
+        return pnl
@@ -0,0 +1,278 @@
+"""
+Middleware Web3 : cache des eth_call par bloc, déduplication des requêtes
+identiques en vol et comptage des appels RPC par méthode et site d'appel.
+
+  • eth_call est mis en cache par (bloc, to, calldata, from, value). Une
+    requête sur "latest" est rattachée au dernier bloc observé ; le cache est
+    vidé dès qu'un bloc plus récent apparaît dans une réponse (blockNumber,
+    getBlock, receipts, logs) ; l'envoi d'une TX vide les caches de tous
+    les providers. Faute de nouveau bloc
+    observé, une entrée "latest" expire après RPC_CACHE_TTL secondes.
+  • eth_chainId / net_version sont mis en cache définitivement.
+  • Deux threads qui lancent la même requête cachable partagent un seul
+    appel réseau.
+
+Installation :
+    w3.middleware_onion.add(call_cache_middleware, name="call_cache")
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from config import RPC_CACHE, RPC_CACHE_TTL, RPC_STATS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+_THIS_FILE = os.path.abspath(__file__)
+
+STATIC_METHODS = ("eth_chainId", "net_version")
+LATEST_TAGS = (None, "latest", "pending")
+
+# Compteurs globaux (tous providers confondus) : (méthode, site) → n
+network_calls: Counter = Counter()
+cache_hits: Counter = Counter()
+dedup_hits: Counter = Counter()
+_stats_lock = threading.Lock()
+
+
+def _call_site() -> str:
+    """
+    Premier frame appartenant au bot (hors web3 et hors ce module).
+    """
+    frame = sys._getframe(2)
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if path.startswith(BASE_DIR) and os.path.abspath(path) != _THIS_FILE:
+            return f"{os.path.basename(path)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+def _to_int(value) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return int(value, 16)
+    return int(value)
+
+
+class _InFlight:
+    __slots__ = ("event", "response")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.response = None
+
+
+class CallCache:
+    """
+    État du cache pour un provider.
+    """
+
+    def __init__(self, ttl: float = RPC_CACHE_TTL):
+        self.ttl = ttl
+        self.head = -1
+        self.head_seen_at = 0.0
+        self.entries: Dict[Tuple, Tuple[float, dict]] = {}
+        self.static: Dict[str, dict] = {}
+        self.inflight: Dict[Tuple, _InFlight] = {}
+        self.lock = threading.Lock()
+
+    # --- Suivi des nouveaux blocs ---
+    def observe_block(self, number: Optional[int]):
+        if number is None:
+            return
+        with self.lock:
+            if number > self.head:
+                self.head = number
+                self.head_seen_at = time.monotonic()
+                self.entries.clear()
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+
+    def observe_response(self, method: str, params, response: dict):
+        result = response.get("result")
+        if result is None:
+            return
+        if method == "eth_blockNumber":
+            self.observe_block(_to_int(result))
+        elif method == "eth_getBlockByNumber" and isinstance(result, dict):
+            if params and params[0] in LATEST_TAGS:
+                self.observe_block(_to_int(result.get("number")))
+        elif method == "eth_getTransactionReceipt" and isinstance(result, dict):
+            self.observe_block(_to_int(result.get("blockNumber")))
+        elif method in ("eth_getFilterChanges", "eth_getLogs") and isinstance(result, list):
+            blocks = [_to_int(log.get("blockNumber")) for log in result if isinstance(log, dict)]
+            if blocks:
+                self.observe_block(max(b for b in blocks if b is not None))
+
+    # --- Clés ---
+    def key(self, method: str, params) -> Optional[Tuple]:
+        if method in STATIC_METHODS:
+            return (method,)
+        if method != "eth_call" or not params:
+            return None
+        if len(params) > 2 and params[2]:
+            # stateOverride : résultat propre à cet état simulé
+            return None
+        tx = params[0]
+        tag = params[1] if len(params) > 1 else "latest"
+        if tag in LATEST_TAGS:
+            block = ("latest", self.head)
+        elif isinstance(tag, int) or (isinstance(tag, str) and tag.startswith("0x")):
+            block = ("num", _to_int(tag))
+        else:
+            # "safe", "finalized", hash de bloc… : pas de cache
+            return None
+        return (
+            block,
+            str(tx.get("to", "")).lower(),
+            tx.get("data") or tx.get("input") or "0x",
+            str(tx.get("from", "")).lower(),
+            _to_int(tx.get("value") or 0),
+        )
+
+    def get(self, key: Tuple) -> Optional[dict]:
+        if key[0] in STATIC_METHODS:
+            return self.static.get(key[0])
+        hit = self.entries.get(key)
+        if hit is None:
+            return None
+        stored_at, response = hit
+        if key[0][0] == "latest" and time.monotonic() - stored_at > self.ttl:
+            self.entries.pop(key, None)
+            return None
+        return response
+
+    def put(self, key: Tuple, response: dict):
+        if "error" in response or response.get("result") is None:
+            return
+        if key[0] in STATIC_METHODS:
+            self.static[key[0]] = response
+            return
+        with self.lock:
+            # La tête a pu avancer pendant l'appel : l'entrée serait déjà périmée
+            if key[0][0] == "latest" and key[0][1] != self.head:
+                return
+            self.entries[key] = (time.monotonic(), response)
+
+
+# Un cache par provider (watcher, achat…) : une TX envoyée par l'un
+# change l'état lu par les autres
+_caches: List[CallCache] = []
+
+
+def invalidate_all():
+    """
+    Vide les caches eth_call de tous les providers.
+    """
+    for cache in list(_caches):
+        cache.invalidate()
+
+
+def call_cache_middleware(make_request, w3):
+    """
+    Middleware web3.py (v6) : cache + dédup + comptage.
+    """
+    cache = CallCache()
+    _caches.append(cache)
+
+    def middleware(method, params):
+        site = _call_site() if RPC_STATS else "-"
+
+        if method == "eth_sendRawTransaction":
+            invalidate_all()
+
+        key = cache.key(method, params)
+        if key is None:
+            with _stats_lock:
+                network_calls[(method, site)] += 1
+            response = make_request(method, params)
+            cache.observe_response(method, params, response)
+            return response
+
+        # 1) Cache
+        response = cache.get(key)
+        if response is not None:
+            with _stats_lock:
+                cache_hits[(method, site)] += 1
+            return dict(response)
+
+        # 2) Requête identique déjà en vol → on attend son résultat
+        with cache.lock:
+            pending = cache.inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = cache.inflight[key] = _InFlight()
+        if not owner:
+            pending.event.wait()
+            if pending.response is not None:
+                with _stats_lock:
+                    dedup_hits[(method, site)] += 1
+                return dict(pending.response)
+            # Le propriétaire a échoué : on retente nous-mêmes
+
+        # 3) Appel réseau
+        with _stats_lock:
+            network_calls[(method, site)] += 1
+        try:
+            response = make_request(method, params)
+            if owner:
+                pending.response = response
+            cache.put(key, response)
+            return response
+        finally:
+            if owner:
+                with cache.lock:
+                    cache.inflight.pop(key, None)
+                pending.event.set()
+
+    return middleware
+
+
+def install(w3):
+    """
+    Ajoute le middleware à une instance Web3 (idempotent, no-op si RPC_CACHE=0).
+    """
+    if not RPC_CACHE:
+        return w3
+    try:
+        w3.middleware_onion.add(call_cache_middleware, name="call_cache")
+    except ValueError:
+        pass  # déjà installé
+    return w3
+
+
+def rpc_stats() -> Dict[str, Dict]:
+    """
+    {méthode: {"network": n, "cached": n, "deduped": n, "sites": {site: n réseau}}}
+    """
+    out: Dict[str, Dict] = {}
+    with _stats_lock:
+        for counter, field in ((network_calls, "network"), (cache_hits, "cached"), (dedup_hits, "deduped")):
+            for (method, site), n in counter.items():
+                st = out.setdefault(method, {"network": 0, "cached": 0, "deduped": 0, "sites": Counter()})
+                st[field] += n
+                if field == "network":
+                    st["sites"][site] += n
+    return out
+
+
+def reset_stats():
+    with _stats_lock:
+        network_calls.clear()
+        cache_hits.clear()
+        dedup_hits.clear()
+
+
+def print_rpc_stats(top_sites: int = 3):
+    stats = rpc_stats()
+    print(f"{'méthode':<28} {'réseau':>8} {'cache':>8} {'dédup':>8}")
+    for method, st in sorted(stats.items(), key=lambda kv: -kv[1]["network"]):
+        print(f"{method:<28} {st['network']:>8} {st['cached']:>8} {st['deduped']:>8}")
+        for site, n in st["sites"].most_common(top_sites):
+            print(f"    {n:>8}  {site}")
@@ -0,0 +1,62 @@
+"""
+Fixtures communes : config minimale (posée avant tout import de config) et
+noeud JSON-RPC simulé (mock_node) pour les tests adossés au RPC.
+"""
+import json
+import os
+import sys
+
+import pytest
+from web3 import Web3
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mock_node import DEFAULT_FACTORY, DEFAULT_ROUTER, DEFAULT_WETH, MockNode, serve  # noqa: E402
+
+# load_dotenv n'écrase pas les variables déjà posées : un .env local ne
+# fuit pas dans les tests
+os.environ.update({
+    "PRIVATE_KEY":         "0x" + "11" * 32,
+    "WALLET_ADDRESS":      "0x2c7536E3605D9C16a7a3D7b1898e529396a65c23",
+    "FACTORY_ADDRESS":     DEFAULT_FACTORY,
+    "ROUTER_ADDRESS":      DEFAULT_ROUTER,
+    "WBNB_ADDRESS":        DEFAULT_WETH,
+    "TELEGRAM_BOT_TOKEN":  "",
+    "TELEGRAM_CHAT_ID":    "",
+    "JOURNAL_PATH":        "",
+    "BYTECODE_INDEX_PATH": "",
+})
+
+
+def _abi(name: str) -> list:
+    with open(os.path.join(ROOT, name)) as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def node():
+    """
+    Noeud simulé sans mineur de fond : chaque TX envoyée mine un bloc.
+    """
+    node = MockNode(block_time=0)
+    server, url = serve(node)
+    node.url = url
+    yield node
+    node.stop()
+    server.shutdown()
+
+
+@pytest.fixture
+def w3(node):
+    return Web3(Web3.HTTPProvider(node.url))
+
+
+@pytest.fixture
+def erc20_abi():
+    return _abi("erc20_abi.json")
+
+
+@pytest.fixture
+def router(w3):
+    return w3.eth.contract(address=Web3.to_checksum_address(DEFAULT_ROUTER), abi=_abi("router_abi.json"))
@@ -0,0 +1,91 @@
+import json
+import time
+
+from bytecode_index import BytecodeIndex, fingerprint, normalize_code
+
+# PUSH1 0x80 PUSH1 0x40 MSTORE … PUSH20 <adresse> POP
+PREFIX = bytes.fromhex("6080604052")
+
+
+def _code(address: str, metadata_hash: str) -> bytes:
+    push20 = bytes([0x73]) + bytes.fromhex(address)
+    meta = bytes.fromhex("a264697066735822" + "1220" + metadata_hash + "64736f6c6343000814")
+    return PREFIX + push20 + b"\x50" + meta + len(meta).to_bytes(2, "big")
+
+
+def test_normalize_strips_metadata_and_zeroes_push20():
+    code = _code("11" * 20, "ab" * 32)
+    assert normalize_code(code) == PREFIX + bytes([0x73]) + bytes(20) + b"\x50"
+
+
+def test_normalize_keeps_short_push_operands():
+    code = bytes.fromhex("6001600255")   # PUSH1 1 PUSH1 2 SSTORE
+    assert normalize_code(code) == code
+
+
+def test_normalize_truncated_push():
+    # PUSH32 en fin de code sans ses 32 octets : pas d'exception
+    code = bytes.fromhex("7f" + "ff" * 5)
+    assert normalize_code(code) == bytes.fromhex("7f") + bytes(5)
+
+
+def test_clones_share_fingerprint():
+    a = fingerprint(_code("11" * 20, "ab" * 32))
+    b = fingerprint(_code("22" * 20, "cd" * 32))
+    assert a == b
+    assert fingerprint(PREFIX + b"\x00" + bytes([0x73]) + bytes(20)) != a
+
+
+def test_fingerprint_empty_code():
+    assert fingerprint(b"") is None
+
+
+def test_lookup_mock_templates(node, w3):
+    node.honeypot_ratio = 0.5
+    node.storm(20)
+    tokens = list(node.pairs.values())
+    safe = [t for t in tokens if t not in node.honeypots]
+    bad = [t for t in tokens if t in node.honeypots]
+    index = BytecodeIndex("", min_samples=1)
+
+    fps = {index.lookup(w3, t)[0] for t in safe}
+    assert len(fps) == 1
+    assert index.lookup(w3, bad[0])[0] not in fps
+    assert index.lookup(w3, "0x" + "00" * 19 + "01") == (None, None)
+
+
+def test_verdict_needs_consistent_samples():
+    index = BytecodeIndex("", min_samples=2, ttl=0)
+    index.record("aa", True, "Token sûr ✅")
+    assert index.verdict("aa") is None
+    index.record("aa", True, "Token sûr ✅")
+    assert index.verdict("aa") is True
+
+    index.record("bb", False, "Revente simulée refusée (honeypot)")
+    index.record("bb", False, "Revente simulée refusée (honeypot)")
+    assert index.verdict("bb") is False
+    assert index.reason("bb") == "Revente simulée refusée (honeypot)"
+
+    index.record("aa", False, "Taxe suspecte")
+    assert index.verdict("aa") is None
+
+
+def test_verdict_expires():
+    index = BytecodeIndex("", min_samples=1, ttl=60)
+    index.record("aa", True, "ok")
+    assert index.verdict("aa") is True
+    index.entries["aa"]["last_seen"] = time.time() - 120
+    assert index.verdict("aa") is None
+
+
+def test_replay_skips_malformed_lines(tmp_path):
+    path = tmp_path / "index.jsonl"
+    index = BytecodeIndex(str(path), min_samples=1, ttl=0)
+    index.record("aa", False, "honeypot")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"safe": True}) + "\n")     # sans empreinte
+        f.write('{"fp": "cc", "safe": tr')              # ligne tronquée
+
+    reloaded = BytecodeIndex(str(path), min_samples=1, ttl=0)
+    assert set(reloaded.entries) == {"aa"}
+    assert reloaded.verdict("aa") is False
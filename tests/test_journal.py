@@ -0,0 +1,150 @@
+import time
+
+import pytest
+
+import journal
+from journal import (
+    CANDIDATE, FILL, PNL, STAGE, TX, VERDICT,
+    JournalReader, JournalWriter, latency_stats, percentile, reason_stats, summarize, trade_stats
+)
+
+TOKEN = "0x" + "ab" * 20
+PAIR = "0x" + "cd" * 20
+TXH = "0x" + "ef" * 32
+
+
+@pytest.fixture
+def writer(tmp_path, monkeypatch):
+    """
+    Écrivain global redirigé vers un fichier temporaire : les log_* du bot
+    écrivent dedans.
+    """
+    w = JournalWriter(str(tmp_path / "journal.bin"), flush_interval=60)
+    monkeypatch.setattr(journal, "_writer", w)
+    yield w
+    w.close()
+
+
+def _read(w: JournalWriter) -> JournalReader:
+    w.flush()
+    return JournalReader(w.path)
+
+
+def test_round_trip(writer):
+    journal.log_candidate(TOKEN, PAIR, 1234, 5e18, 7e18)
+    journal.log_verdict(TOKEN, False, "Taxe suspecte >30% (42.0%)", PAIR)
+    journal.log_tx("buy", TOKEN, TXH, 10**16)
+    journal.log_fill("buy", TOKEN, TXH, 1, 1235, 150_000, 0.0003)
+    journal.log_pnl(TOKEN, -0.002, 12.5, 3, paper=True)
+
+    reader = _read(writer)
+    recs = list(reader.records())
+    assert [r[1] for r in recs] == [CANDIDATE, VERDICT, TX, FILL, PNL]
+
+    ts, kind, flag, code, block, a, b, token, ref = recs[0]
+    assert (block, a, b) == (1234, 5e18, 7e18)
+    assert token == bytes.fromhex(TOKEN[2:])
+    assert ref[:20] == bytes.fromhex(PAIR[2:])
+
+    verdict = recs[1]
+    assert verdict[2] == 0
+    # Les chiffres sont normalisés : une raison par règle, pas par valeur
+    assert reader.name(verdict[3]) == "Taxe suspecte >#% (#%)"
+
+    tx = recs[2]
+    assert reader.name(tx[3]) == "buy" and tx[8] == bytes.fromhex(TXH[2:])
+
+    fill = recs[3]
+    assert (fill[2], fill[4], fill[5], fill[6]) == (1, 1235, 150_000, 0.0003)
+
+    pnl = recs[4]
+    assert (pnl[2], pnl[3], pnl[5], pnl[6]) == (1, 3, -0.002, 12.5)
+    reader.close()
+
+
+def test_names_survive_reopen(tmp_path):
+    path = str(tmp_path / "journal.bin")
+    w = JournalWriter(path)
+    assert w.name_id("buy") == 0
+    w.append(STAGE, code=w.name_id("reserves"), a=0.01)
+    w.close()
+
+    w = JournalWriter(path)
+    assert w.name_id("reserves") == 1
+    assert w.name_id("sell") == 2
+    w.append(STAGE, code=w.name_id("sell"), a=0.02)
+    w.close()
+
+    reader = JournalReader(path)
+    assert [reader.name(r[3]) for r in reader.heads()] == ["reserves", "sell"]
+    reader.close()
+
+
+def test_partial_trailing_record_is_ignored(writer):
+    journal.log_stage("reserves", 0.01)
+    journal.log_stage("reserves", 0.02)
+    writer.flush()
+    with open(writer.path, "ab") as f:
+        f.write(b"\x00" * 10)     # arrêt brutal au milieu d'un enregistrement
+    reader = JournalReader(writer.path)
+    assert len(reader) == 2
+    reader.close()
+
+
+def test_since_uses_timestamps(writer):
+    journal.log_stage("a", 0.1)
+    time.sleep(0.02)
+    cut = time.time()
+    journal.log_stage("b", 0.2)
+    reader = _read(writer)
+    assert [reader.name(r[3]) for r in reader.heads(cut)] == ["b"]
+    reader.close()
+
+
+def test_aggregations(writer):
+    other = "0x" + "12" * 20
+    journal.log_verdict(TOKEN, True, "Token sûr ✅")
+    journal.log_verdict(other, False, "Contrat non vérifié")
+    for d in (0.010, 0.020, 0.030, 0.040):
+        journal.log_stage("token_safe", d, TOKEN)
+    journal.log_tx("buy", TOKEN, TXH)
+    journal.log_fill("buy", TOKEN, TXH, 1, 10, 100_000, 0.001)
+    journal.log_fill("paper_buy", TOKEN, None, 1, 10, 200_000, 0.002)
+    journal.log_pnl(TOKEN, 0.01, 5, 2)
+    journal.log_pnl(TOKEN, -0.03, 5, 2, paper=True)
+
+    reader = _read(writer)
+    counts = summarize(reader)
+    assert counts["verdict"] == 2 and counts["stage"] == 4 and counts["pnl"] == 2
+
+    reasons = {r[0]: r[1:] for r in reason_stats(reader)}
+    assert reasons["Token sûr ✅"][:3] == (1, 2, 1)
+    assert reasons["Contrat non vérifié"] == (1, 0, 0, 0.0)
+
+    (name, n, p50, p90, p99), = latency_stats(reader)
+    assert (name, n) == ("token_safe", 4)
+    assert p50 == pytest.approx(30.0) and p99 == pytest.approx(40.0)
+
+    stats = trade_stats(reader)
+    assert (stats["trades"], stats["paper_trades"]) == (1, 1)
+    assert stats["pnl_eth"] == pytest.approx(0.01)
+    assert stats["paper_pnl_eth"] == pytest.approx(-0.03)
+    assert stats["gas_eth"] == pytest.approx(0.001)
+    assert stats["paper_gas_eth"] == pytest.approx(0.002)
+    assert (stats["tx_sent"], stats["fills_ok"]) == (1, 1)
+    reader.close()
+
+
+def test_percentile():
+    assert percentile([], 50) == 0.0
+    values = [float(i) for i in range(101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile(values, 100) == 100.0
+
+
+def test_reader_rejects_foreign_file(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a journal at all")
+    with pytest.raises(ValueError):
+        JournalReader(str(path))
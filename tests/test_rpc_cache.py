@@ -0,0 +1,165 @@
+import threading
+import time
+
+import pytest
+
+import rpc_cache
+from rpc_cache import CallCache, call_cache_middleware
+
+CALL = {"to": "0xAbC0000000000000000000000000000000000001", "data": "0x70a08231"}
+
+
+def _ok(value="0x01"):
+    return {"jsonrpc": "2.0", "id": 1, "result": value}
+
+
+class FakeNode:
+    """
+    make_request comptant les appels, bloquable pour tester la dédup.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.gate = None
+
+    def __call__(self, method, params):
+        self.calls.append(method)
+        if self.gate is not None:
+            self.gate.wait(5)
+        if method == "eth_blockNumber":
+            return _ok(hex(100 + len(self.calls)))
+        return _ok()
+
+
+@pytest.fixture(autouse=True)
+def _isolated_caches(monkeypatch):
+    monkeypatch.setattr(rpc_cache, "_caches", [])
+
+
+def test_key_ignores_address_case_and_follows_head():
+    cache = CallCache()
+    upper = cache.key("eth_call", [CALL, "latest"])
+    lower = cache.key("eth_call", [dict(CALL, to=CALL["to"].lower()), "latest"])
+    assert upper == lower
+    cache.observe_block(7)
+    assert cache.key("eth_call", [CALL, "latest"]) != upper
+    assert cache.key("eth_call", [CALL, "0x7"])[0] == ("num", 7)
+
+
+def test_key_not_cacheable():
+    cache = CallCache()
+    assert cache.key("eth_sendRawTransaction", ["0x00"]) is None
+    assert cache.key("eth_call", [CALL, "finalized"]) is None
+    # stateOverride : résultat propre à l'état simulé
+    assert cache.key("eth_call", [CALL, "latest", {CALL["to"]: {"stateDiff": {}}}]) is None
+    assert cache.key("eth_chainId", []) == ("eth_chainId",)
+
+
+def test_new_block_invalidates_latest_entries():
+    cache = CallCache()
+    key = cache.key("eth_call", [CALL, "latest"])
+    cache.put(key, _ok())
+    assert cache.get(key) is not None
+    cache.observe_response("eth_blockNumber", [], _ok("0x10"))
+    assert cache.entries == {}
+
+
+def test_put_skips_entries_made_stale_during_the_call():
+    cache = CallCache()
+    key = cache.key("eth_call", [CALL, "latest"])
+    cache.observe_block(5)
+    cache.put(key, _ok())
+    assert cache.get(key) is None
+
+
+def test_put_skips_errors():
+    cache = CallCache()
+    key = cache.key("eth_call", [CALL, "latest"])
+    cache.put(key, {"error": {"code": 3, "message": "execution reverted"}})
+    assert cache.get(key) is None
+
+
+def test_latest_entries_expire_without_new_block():
+    cache = CallCache(ttl=0.05)
+    key = cache.key("eth_call", [CALL, "latest"])
+    pinned = cache.key("eth_call", [CALL, "0x1"])
+    cache.put(key, _ok())
+    cache.put(pinned, _ok())
+    time.sleep(0.1)
+    assert cache.get(key) is None
+    assert cache.get(pinned) is not None
+
+
+def test_middleware_caches_and_counts():
+    node = FakeNode()
+    mw = call_cache_middleware(node, None)
+    assert mw("eth_call", [CALL, "latest"]) == _ok()
+    assert mw("eth_call", [CALL, "latest"]) == _ok()
+    assert node.calls == ["eth_call"]
+    # Nouveau bloc observé → nouvel appel
+    mw("eth_blockNumber", [])
+    mw("eth_call", [CALL, "latest"])
+    assert node.calls == ["eth_call", "eth_blockNumber", "eth_call"]
+
+
+def test_send_invalidates_every_provider():
+    watcher_node, buyer_node = FakeNode(), FakeNode()
+    watcher = call_cache_middleware(watcher_node, None)
+    buyer = call_cache_middleware(buyer_node, None)
+    watcher("eth_call", [CALL, "latest"])
+    buyer("eth_sendRawTransaction", ["0x00"])
+    watcher("eth_call", [CALL, "latest"])
+    assert watcher_node.calls == ["eth_call", "eth_call"]
+
+
+def test_concurrent_identical_calls_share_one_request():
+    node = FakeNode()
+    node.gate = threading.Event()
+    mw = call_cache_middleware(node, None)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(mw("eth_call", [CALL, "latest"])))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    node.gate.set()
+    for t in threads:
+        t.join(5)
+    assert node.calls == ["eth_call"]
+    assert results == [_ok()] * 5
+
+
+def test_waiters_retry_when_the_owner_fails():
+    attempts = []
+    gate = threading.Event()
+
+    def flaky(method, params):
+        attempts.append(method)
+        if len(attempts) == 1:
+            gate.wait(5)
+            raise ConnectionError("rpc down")
+        return _ok()
+
+    mw = call_cache_middleware(flaky, None)
+    errors, results = [], []
+
+    def owner():
+        try:
+            mw("eth_call", [CALL, "latest"])
+        except ConnectionError as e:
+            errors.append(e)
+
+    first = threading.Thread(target=owner)
+    first.start()
+    time.sleep(0.05)
+    second = threading.Thread(target=lambda: results.append(mw("eth_call", [CALL, "latest"])))
+    second.start()
+    time.sleep(0.05)
+    gate.set()
+    first.join(5)
+    second.join(5)
+    assert len(errors) == 1
+    assert results == [_ok()]
+    assert len(attempts) == 2
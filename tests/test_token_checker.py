@@ -0,0 +1,143 @@
+from decimal import Decimal
+
+import pytest
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+import mock_node
+from mock_node import DEFAULT_ROUTER, DEFAULT_WETH
+from token_checker import funding_override, is_token_safe, measure_leg_tax, measure_taxes, probe_leg
+
+WALLET = "0x2c7536E3605D9C16a7a3D7b1898e529396a65c23"
+QUOTE = 10**18
+MAX_TAX = Decimal("30")
+
+
+class FakeSwap:
+    """
+    Swap simulé recevant `received` : revert si amountOutMin est au-dessus,
+    ou toujours si `refused`.
+    """
+
+    def __init__(self, tax_pct: float, refused: bool = False):
+        self.received = int(QUOTE * (100 - tax_pct) / 100)
+        self.refused = refused
+        self.calls = []
+
+    def __call__(self, min_out: int):
+        self.calls.append(min_out)
+        if self.refused or min_out > self.received:
+            raise ContractLogicError("execution reverted: INSUFFICIENT_OUTPUT_AMOUNT")
+
+
+@pytest.mark.parametrize("tax, expected", [(0, True), (30, True), (30.1, False), (80, False)])
+def test_probe_leg_threshold(tax, expected):
+    swap = FakeSwap(tax)
+    assert probe_leg(swap, QUOTE, MAX_TAX) is expected
+
+
+def test_probe_leg_single_call_when_under_threshold():
+    swap = FakeSwap(5)
+    probe_leg(swap, QUOTE, MAX_TAX)
+    assert swap.calls == [int(QUOTE * 70 / 100)]
+
+
+def test_probe_leg_refused():
+    swap = FakeSwap(0, refused=True)
+    assert probe_leg(swap, QUOTE, MAX_TAX) is None
+    assert swap.calls[-1] == 0
+
+
+def test_probe_leg_propagates_rpc_errors():
+    def broken(min_out):
+        raise ConnectionError("rpc down")
+    with pytest.raises(ConnectionError):
+        probe_leg(broken, QUOTE, MAX_TAX)
+
+
+def test_measure_leg_tax_no_tax_single_call():
+    swap = FakeSwap(0)
+    assert measure_leg_tax(swap, QUOTE, MAX_TAX) == 0
+    assert swap.calls == [QUOTE]
+
+
+@pytest.mark.parametrize("tax", [1, 5, 12.5, 29])
+def test_measure_leg_tax_bisection(tax):
+    steps = 8
+    measured = measure_leg_tax(FakeSwap(tax), QUOTE, MAX_TAX, steps)
+    # Milieu de l'intervalle final : erreur ≤ max_tax / 2**(steps + 1)
+    assert abs(float(measured) - tax) <= float(MAX_TAX) / 2 ** (steps + 1) + 1e-9
+
+
+def test_measure_leg_tax_over_threshold_and_refused():
+    assert measure_leg_tax(FakeSwap(45), QUOTE, MAX_TAX) == MAX_TAX
+    assert measure_leg_tax(FakeSwap(0, refused=True), QUOTE, MAX_TAX) is None
+
+
+def _token(node):
+    node.storm(1)
+    return Web3.to_checksum_address(list(node.pairs.values())[-1])
+
+
+def test_funding_override_credits_balance_and_allowance(node, w3, erc20_abi):
+    token = w3.eth.contract(address=_token(node), abi=erc20_abi)
+    router = Web3.to_checksum_address(DEFAULT_ROUTER)
+    override = funding_override(token, WALLET, router, 1234)
+    # Deux appels : un par mapping
+    assert node.calls["eth_call"] == 2
+    assert override is not None
+    assert token.functions.balanceOf(WALLET).call() == 0
+    assert token.functions.balanceOf(WALLET).call(state_override=override) == 1234
+    assert token.functions.allowance(WALLET, router).call(state_override=override) == 1234
+
+
+def test_funding_override_unknown_layout(node, w3, erc20_abi, monkeypatch):
+    # Slot _balances hors de STORAGE_SLOTS : None plutôt qu'un faux crédit
+    monkeypatch.setattr(mock_node, "BALANCE_SLOT", 64)
+    token = w3.eth.contract(address=_token(node), abi=erc20_abi)
+    assert funding_override(token, WALLET, DEFAULT_ROUTER, 1) is None
+
+
+def _check(node, w3, router, erc20_abi, token):
+    details = {}
+    before = node.calls["eth_call"]
+    safe, reason = is_token_safe(w3, router, token, DEFAULT_WETH, WALLET, erc20_abi,
+                                 DEFAULT_WETH, max_tax_percent=MAX_TAX, details=details)
+    return safe, reason, details, node.calls["eth_call"] - before
+
+
+def test_is_token_safe_clean(node, w3, router, erc20_abi):
+    safe, reason, details, calls = _check(node, w3, router, erc20_abi, _token(node))
+    assert safe and details["definitive"]
+    # getAmountsOut ×2, un probe par jambe, deux lectures de slot
+    assert calls == 6
+
+
+def test_is_token_safe_taxed_under_threshold(node, w3, router, erc20_abi):
+    node.token_tax = 0.10
+    safe, reason, details, calls = _check(node, w3, router, erc20_abi, _token(node))
+    assert safe
+    assert calls == 6
+
+
+def test_is_token_safe_excessive_tax(node, w3, router, erc20_abi):
+    node.token_tax = 0.35
+    safe, reason, details, _ = _check(node, w3, router, erc20_abi, _token(node))
+    assert not safe and "à l'achat" in reason
+    assert details["definitive"]
+
+
+def test_is_token_safe_honeypot(node, w3, router, erc20_abi):
+    token = _token(node)
+    node.honeypots.add(token.lower())
+    safe, reason, details, _ = _check(node, w3, router, erc20_abi, token)
+    assert not safe and "honeypot" in reason
+    assert details["definitive"]
+
+
+def test_measure_taxes(node, w3, router, erc20_abi):
+    node.token_tax = 0.12
+    buy_tax, sell_tax = measure_taxes(w3, router, _token(node), DEFAULT_WETH, WALLET,
+                                      erc20_abi, DEFAULT_WETH, max_tax_percent=MAX_TAX)
+    assert buy_tax == pytest.approx(12, abs=0.1)
+    assert sell_tax == pytest.approx(12, abs=0.1)
@@ -0,0 +1,96 @@
+import pytest
+from eth_account import Account
+from web3 import Web3
+
+from wallets import WalletPool
+
+KEYS = ["0x" + f"{i:064x}" for i in (0xa1, 0xa2, 0xa3)]
+TREASURY = "0x" + "77" * 20
+ETH = 10**18
+
+
+def _token(i: int) -> str:
+    return Web3.to_checksum_address("0x" + f"{0xbe000000 + i:040x}")
+
+
+@pytest.fixture
+def pool(w3):
+    # Le noeud simulé crédite 100 ETH à chaque compte
+    return WalletPool(w3, KEYS, TREASURY)
+
+
+def test_funded_capital_read_at_start(pool):
+    assert all(w.funded_wei == 100 * ETH for w in pool.wallets)
+    assert pool.wallets[0].address == Account.from_key(KEYS[0]).address
+
+
+def test_acquire_spreads_positions(pool):
+    wallets = [pool.acquire(_token(i), ETH) for i in range(3)]
+    assert len({w.address for w in wallets}) == 3
+    assert pool.acquire(_token(3), ETH) is None
+    assert not pool.has_capacity()
+    assert pool.acquire(_token(3), ETH, max_positions=2) is not None
+
+
+def test_acquire_is_idempotent_per_token(pool):
+    first = pool.acquire(_token(0), ETH)
+    assert pool.acquire(_token(0).lower(), ETH) is first
+    assert pool.wallet_for(_token(0)) is first
+    # Une seule réservation du solde
+    assert first.balance_wei == 99 * ETH
+
+
+def test_acquire_respects_min_balance(pool):
+    assert pool.acquire(_token(0), 101 * ETH) is None
+    # La réservation optimiste compte : 60 + 60 > 100 sur un même wallet
+    for w in pool.wallets[1:]:
+        w.balance_wei = 0
+    assert pool.acquire(_token(0), 60 * ETH, max_positions=2) is pool.wallets[0]
+    assert pool.acquire(_token(1), 60 * ETH, max_positions=2) is None
+
+
+def test_release_frees_the_wallet(pool):
+    wallet = pool.acquire(_token(0), ETH)
+    assert pool.release(_token(0)) is wallet
+    assert not wallet.positions
+    assert pool.wallet_for(_token(0)) is None
+    assert wallet.balance_wei == 100 * ETH
+    assert pool.release(_token(0)) is None
+
+
+def test_sweep_skips_wallet_with_open_position(node, pool):
+    wallet = pool.acquire(_token(0), ETH)
+    wallet.funded_wei = 50 * ETH
+    assert pool.sweep(wallet, ETH) is None
+    assert node.tx_count == 0
+
+
+def test_sweep_leaves_starting_capital(node, pool):
+    wallet = pool.wallets[0]
+    assert pool.sweep(wallet, ETH) is None
+    assert node.tx_count == 0
+
+
+def test_sweep_sends_only_the_profit(node, pool):
+    wallet = pool.wallets[0]
+    wallet.funded_wei = 90 * ETH
+    txh = pool.sweep(wallet, ETH)
+    assert txh is not None
+    assert node.tx_count == 1
+    # Solde optimiste après envoi : capital de départ, gas du transfert payé
+    assert wallet.balance_wei == 90 * ETH
+
+
+def test_sweep_keeps_working_capital(node, pool):
+    wallet = pool.wallets[0]
+    wallet.funded_wei = 10 * ETH
+    pool.sweep(wallet, 95 * ETH)
+    assert wallet.balance_wei == 95 * ETH
+
+
+def test_sweep_never_from_treasury(node, w3):
+    key = KEYS[0]
+    pool = WalletPool(w3, [key], Account.from_key(key).address)
+    pool.wallets[0].funded_wei = 0
+    assert pool.sweep(pool.wallets[0], 0) is None
+    assert node.tx_count == 0
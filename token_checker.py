@@ -1,8 +1,201 @@
 from web3 import Web3
+from web3.exceptions import ContractLogicError
 from decimal import Decimal
-from typing import Tuple, List
+from typing import Callable, Tuple, List, Optional
 import time
 
+# Emplacements testés pour les mappings _balances / _allowances d'un ERC20
+# (disposition Solidity : mapping[clé] est à keccak(pad32(clé) . pad32(slot)))
+STORAGE_SLOTS = range(32)
+_PROBE_MARKER = 10**30
+
+
+def _mapping_key(key: str, slot) -> bytes:
+    slot = slot if isinstance(slot, bytes) else slot.to_bytes(32, "big")
+    return Web3.keccak(bytes.fromhex(key[2:].rjust(64, "0")) + slot)
+
+
+def _find_slot(read: Callable[[dict], int], key_for: Callable[[int], bytes]) -> Optional[int]:
+    """
+    Slot du mapping en un seul eth_call : chaque candidat reçoit une valeur
+    marquée (marqueur + slot), la valeur relue désigne le bon.
+    """
+    diff = {
+        Web3.to_hex(key_for(slot)): Web3.to_hex((_PROBE_MARKER + slot).to_bytes(32, "big"))
+        for slot in STORAGE_SLOTS
+    }
+    found = read(diff) - _PROBE_MARKER
+    return found if found in STORAGE_SLOTS else None
+
+
+def funding_override(token, owner: str, spender: str, amount: int) -> Optional[dict]:
+    """
+    stateOverride d'eth_call créditant `owner` de `amount` tokens avec une
+    allowance `amount` pour `spender`. Un eth_call ne persiste rien : sans
+    ce crédit, la revente simulée après un achat simulé part d'un solde nul.
+
+    Deux appels (slot de _balances, puis de _allowances). None si le token
+    calcule ses soldes (reflection…) ou range ses mappings ailleurs.
+    """
+    addr = token.address
+    owner, spender = Web3.to_checksum_address(owner), Web3.to_checksum_address(spender)
+
+    balance_slot = _find_slot(
+        lambda diff: token.functions.balanceOf(owner).call(state_override={addr: {"stateDiff": diff}}),
+        lambda slot: _mapping_key(owner, slot)
+    )
+    if balance_slot is None:
+        return None
+    allowance_slot = _find_slot(
+        lambda diff: token.functions.allowance(owner, spender).call(state_override={addr: {"stateDiff": diff}}),
+        lambda slot: _mapping_key(spender, _mapping_key(owner, slot))
+    )
+    if allowance_slot is None:
+        return None
+
+    value = Web3.to_hex(amount.to_bytes(32, "big"))
+    return {addr: {"stateDiff": {
+        Web3.to_hex(_mapping_key(owner, balance_slot)): value,
+        Web3.to_hex(_mapping_key(spender, _mapping_key(owner, allowance_slot))): value,
+    }}}
+
+
+def probe_leg(
+    simulate: Callable[[int], None],
+    quote: int,
+    max_tax_percent: Decimal
+) -> Optional[bool]:
+    """
+    Verdict d'une jambe de swap au seuil de taxe, sans la mesurer.
+
+    `quote` est la sortie getAmountsOut (frais et impact déjà inclus) et
+    `simulate(min_out)` appelle le swap SupportingFeeOnTransferTokens avec
+    amountOutMin = min_out : le router revert si ce qui est réellement reçu
+    est < amountOutMin. Un seul eth_call à quote × (1 - max_tax) dans le
+    cas courant, un second à 0 seulement si le premier revert.
+
+    True si la taxe de transfert ne dépasse pas max_tax_percent, False si
+    elle le dépasse, None si le swap revert même sans minimum (refusé). Les
+    erreurs autres qu'un revert (RPC…) sont propagées.
+    """
+    floor = int(quote * (100 - max_tax_percent) / 100)
+    try:
+        simulate(floor)
+        return True
+    except ContractLogicError:
+        pass
+    try:
+        simulate(0)
+    except ContractLogicError:
+        return None
+    return False
+
+
+def measure_leg_tax(
+    simulate: Callable[[int], None],
+    quote: int,
+    max_tax_percent: Decimal,
+    steps: int = 8
+) -> Optional[Decimal]:
+    """
+    Taxe de transfert (%) d'une jambe de swap, hors frais AMM et impact prix.
+
+    Mêmes `simulate` / `quote` que probe_leg : le plus grand amountOutMin
+    accepté donne la sortie réelle, cherchée par dichotomie entre quote et
+    quote × (1 - max_tax). Jusqu'à 3 + steps eth_call séquentiels : à
+    réserver hors du chemin critique (mode paper). À la vente la taxe est
+    prélevée à l'entrée de la paire : l'écart de sortie l'égale au facteur
+    d'impact prix près, négligeable pour un montant de test.
+
+    Retourne None si le swap est refusé, max_tax_percent si la taxe le
+    dépasse, sinon le milieu de l'intervalle final (erreur ≤
+    max_tax / 2**(steps + 1)).
+    """
+    # 1) Cas courant : aucune taxe, un seul appel
+    try:
+        simulate(quote)
+        return Decimal(0)
+    except ContractLogicError:
+        pass
+
+    # 2) Refusé, ou taxe au-delà du seuil
+    verdict = probe_leg(simulate, quote, max_tax_percent)
+    if not verdict:
+        return None if verdict is None else max_tax_percent
+
+    # 3) Dichotomie : lo accepté, hi refusé
+    lo, hi = int(quote * (100 - max_tax_percent) / 100), quote
+    for _ in range(steps):
+        mid = (lo + hi) // 2
+        try:
+            simulate(mid)
+            lo = mid
+        except ContractLogicError:
+            hi = mid
+    return (Decimal(quote) - Decimal(lo + hi) / 2) / Decimal(quote) * 100
+
+
+def _test_swaps(
+    web3: Web3,
+    router,
+    token_address: str,
+    base_token: str,
+    wallet: str,
+    erc20_abi: List[dict],
+    native_wrap: str,
+    test_amount: Decimal
+) -> dict:
+    """
+    Contrats, montant et constructeurs des swaps simulés d'un aller-retour
+    de test, partagés par is_token_safe et measure_taxes.
+    """
+    token_addr = Web3.to_checksum_address(token_address)
+    base_addr = Web3.to_checksum_address(base_token)
+    wallet_addr = Web3.to_checksum_address(wallet)
+    native = base_addr == Web3.to_checksum_address(native_wrap)
+
+    token = web3.eth.contract(address=token_addr, abi=erc20_abi)
+    base_contract = None if native else web3.eth.contract(address=base_addr, abi=erc20_abi)
+
+    if native:
+        buy_amount = web3.to_wei(test_amount, 'ether')
+    else:
+        decimals = base_contract.functions.decimals().call()
+        buy_amount = int(test_amount * Decimal(10**decimals))
+
+    buy_path = [base_addr, token_addr]
+    sell_path = [token_addr, base_addr]
+
+    def buy(override: Optional[dict] = None) -> Callable[[int], None]:
+        if native:
+            def simulate(min_out: int):
+                router.functions.swapExactETHForTokensSupportingFeeOnTransferTokens(
+                    min_out, buy_path, wallet_addr, int(time.time()) + 60
+                ).call({'from': wallet_addr, 'value': buy_amount})
+        else:
+            def simulate(min_out: int):
+                router.functions.swapExactTokensForTokensSupportingFeeOnTransferTokens(
+                    buy_amount, min_out, buy_path, wallet_addr, int(time.time()) + 60
+                ).call({'from': wallet_addr}, state_override=override)
+        return simulate
+
+    def sell(balance: int, override: dict) -> Callable[[int], None]:
+        swap = (router.functions.swapExactTokensForETHSupportingFeeOnTransferTokens if native
+                else router.functions.swapExactTokensForTokensSupportingFeeOnTransferTokens)
+
+        def simulate(min_out: int):
+            swap(
+                balance, min_out, sell_path, wallet_addr, int(time.time()) + 60
+            ).call({'from': wallet_addr}, state_override=override)
+        return simulate
+
+    return {
+        "token": token, "base": base_contract, "native": native,
+        "wallet": wallet_addr, "amount": buy_amount,
+        "buy_path": buy_path, "sell_path": sell_path,
+        "buy": buy, "sell": sell,
+    }
+
 
 def is_token_safe(
     web3: Web3,
@@ -13,93 +206,120 @@ def is_token_safe(
     erc20_abi: List[dict],
     native_wrap: str,
     test_amount: Decimal = Decimal('0.01'),
-    max_tax_percent: Decimal = Decimal('30')
+    max_tax_percent: Decimal = Decimal('30'),
+    details: Optional[dict] = None
 ) -> Tuple[bool, str]:
     """
     Vérifie si un token est sécuritaire :
     1) Swappable à l'achat
     2) Achat simulé possible
     3) Revente simulée possible
-    4) Taxe raisonnable (< max_tax_percent)
+    4) Taxe raisonnable (≤ max_tax_percent à l'achat comme à la vente)
 
     Gère BNB natif (swapExactETH...) ou base ERC20 (swapExactTokens...).
+    Chaque eth_call part de l'état réel : les soldes et allowances de test
+    (base ERC20 à l'achat, token à la revente) sont injectés par
+    stateOverride (voir funding_override).
+    La taxe est celle du token (transfert), jugée au seuil sur la sortie
+    réelle des swaps simulés (voir probe_leg) : un eth_call par jambe, la
+    mesure précise est laissée à measure_taxes, hors chemin critique.
+    Si `details` est fourni, il reçoit "definitive" = True quand le verdict
+    vient de la revente simulée ou de la taxe : les autres refus (RPC,
+    trading pas encore ouvert…) peuvent changer d'un appel à l'autre.
     """
-    try:
-        # Normalisation adresses
-        token_addr = Web3.to_checksum_address(token_address)
-        base_addr = Web3.to_checksum_address(base_token)
-        wallet_addr = Web3.to_checksum_address(wallet)
-        wrap_addr = Web3.to_checksum_address(native_wrap)
-
-        # Contrat token & base
-        token = web3.eth.contract(address=token_addr, abi=erc20_abi)
-        base_contract = None
-        if base_addr != wrap_addr:
-            base_contract = web3.eth.contract(address=base_addr, abi=erc20_abi)
-
-        # Montant test
-        if base_addr == wrap_addr:
-            buy_amount = web3.to_wei(test_amount, 'ether')
-        else:
-            decimals = base_contract.functions.decimals().call()
-            buy_amount = int(test_amount * Decimal(10**decimals))
+    def definitive(safe: bool, reason: str) -> Tuple[bool, str]:
+        if details is not None:
+            details["definitive"] = True
+        return safe, reason
 
-        buy_path = [base_addr, token_addr]
-        sell_path = [token_addr, base_addr]
+    try:
+        swaps = _test_swaps(web3, router, token_address, base_token, wallet,
+                            erc20_abi, native_wrap, test_amount)
+        wallet_addr, buy_amount = swaps["wallet"], swaps["amount"]
 
         # 1) Estimation getAmountsOut
         try:
-            router.functions.getAmountsOut(buy_amount, buy_path).call()
+            buy_quote = router.functions.getAmountsOut(buy_amount, swaps["buy_path"]).call()[-1]
         except Exception:
             return False, "Non swapable à l'achat (getAmountsOut échoué)"
 
-        # 2) Achat simulé
-        if base_addr == wrap_addr:
-            try:
-                router.functions.swapExactETHForTokensSupportingFeeOnTransferTokens(
-                    0, buy_path, wallet_addr, int(time.time()) + 60
-                ).call({'from': wallet_addr, 'value': buy_amount})
-            except Exception:
-                return False, "Achat simulé refusé (blacklist/honeypot)"
+        # 2) Achat simulé, taxe à l'achat au seuil
+        if swaps["native"]:
+            simulate_buy = swaps["buy"]()
+            refused = "Achat simulé refusé (blacklist/honeypot)"
         else:
-            try:
-                base_contract.functions.approve(router.address, buy_amount).call({'from': wallet_addr})
-                router.functions.swapExactTokensForTokensSupportingFeeOnTransferTokens(
-                    buy_amount, 0, buy_path, wallet_addr, int(time.time()) + 60
-                ).call({'from': wallet_addr})
-            except Exception:
-                return False, "Achat simulé refusé (honeypot ou approval)"
-
-        # 3) Revente simulée
-        balance = token.functions.balanceOf(wallet_addr).call()
-        if balance == 0:
-            return False, "Balance = 0 après achat simulé"
-
-        if base_addr == wrap_addr:
-            try:
-                token.functions.approve(router.address, balance).call({'from': wallet_addr})
-                router.functions.swapExactTokensForETHSupportingFeeOnTransferTokens(
-                    balance, 0, sell_path, wallet_addr, int(time.time()) + 60
-                ).call({'from': wallet_addr})
-            except Exception:
-                return False, "Revente simulée refusée (honeypot)"
-        else:
-            try:
-                token.functions.approve(router.address, balance).call({'from': wallet_addr})
-                router.functions.swapExactTokensForTokensSupportingFeeOnTransferTokens(
-                    balance, 0, sell_path, wallet_addr, int(time.time()) + 60
-                ).call({'from': wallet_addr})
-            except Exception:
-                return False, "Revente simulée refusée (honeypot)"
+            base_override = funding_override(swaps["base"], wallet_addr, router.address, buy_amount)
+            if base_override is None:
+                return False, "Achat non simulable (stockage de la base non standard)"
+            simulate_buy = swaps["buy"](base_override)
+            refused = "Achat simulé refusé (honeypot ou approval)"
+        try:
+            buy_ok = probe_leg(simulate_buy, buy_quote, max_tax_percent)
+        except Exception:
+            buy_ok = None
+        if buy_ok is None:
+            return False, refused
+        if not buy_ok:
+            return definitive(False, f"Taxe suspecte >{max_tax_percent}% à l'achat")
+
+        # 3) Revente simulée, taxe à la vente au seuil, depuis un solde
+        #    injecté égal au quote de l'achat de test (l'achat simulé n'a rien
+        #    persisté)
+        balance = buy_quote
+        sell_override = funding_override(swaps["token"], wallet_addr, router.address, balance)
+        if sell_override is None:
+            return False, "Revente non simulable (stockage du token non standard)"
 
-        # 4) Vérification taxe
-        out_est = router.functions.getAmountsOut(buy_amount, buy_path).call()[-1]
-        back_est = router.functions.getAmountsOut(out_est, sell_path).call()[-1]
-        loss_pct = (Decimal(buy_amount) - Decimal(back_est)) / Decimal(buy_amount) * 100
-        if loss_pct > max_tax_percent:
-            return False, f"Taxe suspecte >{max_tax_percent}% ({loss_pct:.1f}%)"
+        sell_quote = router.functions.getAmountsOut(balance, swaps["sell_path"]).call()[-1]
+        sell_ok = probe_leg(swaps["sell"](balance, sell_override), sell_quote, max_tax_percent)
+        if sell_ok is None:
+            return definitive(False, "Revente simulée refusée (honeypot)")
+        if not sell_ok:
+            return definitive(False, f"Taxe suspecte >{max_tax_percent}% à la vente")
 
-        return True, "Token sûr ✅"
+        return definitive(True, "Token sûr ✅")
 
     except Exception as e:
         return False, f"Erreur vérif token : {e}"
+
+
+def measure_taxes(
+    web3: Web3,
+    router,
+    token_address: str,
+    base_token: str,
+    wallet: str,
+    erc20_abi: List[dict],
+    native_wrap: str,
+    test_amount: Decimal = Decimal('0.01'),
+    max_tax_percent: Decimal = Decimal('30')
+) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Taxes de transfert (achat, vente) en % d'un token déjà jugé sûr, par
+    dichotomie sur les mêmes swaps simulés que is_token_safe (voir
+    measure_leg_tax). Jusqu'à une vingtaine d'eth_call séquentiels : pour
+    le mode paper, jamais avant l'achat réel. (None, None) si la mesure
+    échoue.
+    """
+    try:
+        swaps = _test_swaps(web3, router, token_address, base_token, wallet,
+                            erc20_abi, native_wrap, test_amount)
+        wallet_addr, buy_amount = swaps["wallet"], swaps["amount"]
+
+        buy_quote = router.functions.getAmountsOut(buy_amount, swaps["buy_path"]).call()[-1]
+        base_override = None
+        if not swaps["native"]:
+            base_override = funding_override(swaps["base"], wallet_addr, router.address, buy_amount)
+        buy_tax = measure_leg_tax(swaps["buy"](base_override), buy_quote, max_tax_percent)
+
+        sell_override = funding_override(swaps["token"], wallet_addr, router.address, buy_quote)
+        if buy_tax is None or sell_override is None:
+            return None, None
+        sell_quote = router.functions.getAmountsOut(buy_quote, swaps["sell_path"]).call()[-1]
+        sell_tax = measure_leg_tax(swaps["sell"](buy_quote, sell_override), sell_quote, max_tax_percent)
+        if sell_tax is None:
+            return None, None
+        return float(buy_tax), float(sell_tax)
+
+    except Exception:
+        return None, None
@@ -0,0 +1,189 @@
+"""
+Pool de wallets pour l'exécution parallèle.
+
+Chaque position est affectée au wallet le moins chargé (moins de positions
+ouvertes, puis plus gros solde). Chaque wallet a son propre flux de nonces
+géré localement : une TX bloquée sur un wallet ne retarde pas les autres.
+Quand un wallet n'a plus de position ouverte, seuls les profits sont
+balayés vers TREASURY_ADDRESS : le solde au-delà du capital de départ du
+wallet (lu au démarrage), sans jamais descendre sous le fonds de roulement
+(BUY_AMOUNT + réserve de gas).
+"""
+import threading
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from eth_account import Account
+from web3 import Web3
+
+
+class Wallet:
+    """
+    Un compte du pool : clé, flux de nonces local et solde suivi.
+    """
+
+    def __init__(self, web3: Web3, private_key: str):
+        self.web3 = web3
+        self.key = private_key
+        self.address = Web3.to_checksum_address(Account.from_key(private_key).address)
+        self.positions = set()
+        self.balance_wei = 0
+        # Capital de départ : seul l'excédent est un profit balayable
+        self.funded_wei: Optional[int] = None
+        self._nonce: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def next_nonce(self) -> int:
+        """
+        Nonce suivant du flux local (initialisé depuis le bloc 'pending').
+        """
+        with self._lock:
+            if self._nonce is None:
+                self._nonce = self.web3.eth.get_transaction_count(self.address, 'pending')
+            nonce = self._nonce
+            self._nonce += 1
+            return nonce
+
+    def resync(self):
+        """
+        À appeler quand une TX n'a pas été envoyée ou a été rejetée pour
+        nonce : le prochain next_nonce() relira le compteur du noeud.
+        """
+        with self._lock:
+            self._nonce = None
+
+    def refresh_balance(self) -> int:
+        self.balance_wei = self.web3.eth.get_balance(self.address)
+        return self.balance_wei
+
+    def sign_and_send(self, tx: dict):
+        """
+        Signe avec la clé du wallet et envoie. En cas d'échec le flux de
+        nonces est resynchronisé pour ne pas laisser de trou.
+        """
+        try:
+            signed = self.web3.eth.account.sign_transaction(tx, self.key)
+            return self.web3.eth.send_raw_transaction(signed.rawTransaction)
+        except Exception:
+            self.resync()
+            raise
+
+
+class WalletPool:
+    """
+    Affectation des positions aux wallets + balayage vers la trésorerie.
+    """
+
+    def __init__(self, web3: Web3, private_keys: List[str], treasury: str):
+        self.web3 = web3
+        self.wallets = [Wallet(web3, k) for k in private_keys]
+        self.treasury = Web3.to_checksum_address(treasury)
+        self._by_token: Dict[str, Wallet] = {}
+        self._lock = threading.Lock()
+        for w in self.wallets:
+            try:
+                w.funded_wei = w.refresh_balance()
+            except Exception as e:
+                print(f"⚠️ Solde illisible pour {w.address}: {e}")
+
+    def __len__(self) -> int:
+        return len(self.wallets)
+
+    def has_capacity(self, max_positions: int = 1) -> bool:
+        with self._lock:
+            return any(len(w.positions) < max_positions for w in self.wallets)
+
+    def acquire(self, token: str, min_balance_wei: int = 0, max_positions: int = 1) -> Optional[Wallet]:
+        """
+        Affecte `token` au wallet le moins chargé ayant au moins
+        `min_balance_wei`. None si aucun wallet disponible.
+        """
+        token = Web3.to_checksum_address(token)
+        with self._lock:
+            if token in self._by_token:
+                return self._by_token[token]
+            candidates = [
+                w for w in self.wallets
+                if len(w.positions) < max_positions and w.balance_wei >= min_balance_wei
+            ]
+            if not candidates:
+                return None
+            wallet = min(candidates, key=lambda w: (len(w.positions), -w.balance_wei))
+            wallet.positions.add(token)
+            # Réservation optimiste : évite d'affecter le même solde deux fois
+            wallet.balance_wei -= min_balance_wei
+            self._by_token[token] = wallet
+            return wallet
+
+    def wallet_for(self, token: str) -> Optional[Wallet]:
+        with self._lock:
+            return self._by_token.get(Web3.to_checksum_address(token))
+
+    def release(self, token: str):
+        """
+        Clôt la position `token` et rafraîchit le solde réel du wallet.
+        """
+        with self._lock:
+            wallet = self._by_token.pop(Web3.to_checksum_address(token), None)
+            if wallet:
+                wallet.positions.discard(Web3.to_checksum_address(token))
+        if wallet:
+            try:
+                wallet.refresh_balance()
+            except Exception as e:
+                print(f"⚠️ Solde illisible pour {wallet.address}: {e}")
+        return wallet
+
+    def sweep(self, wallet: Wallet, keep_wei: int) -> Optional[str]:
+        """
+        Transfère vers la trésorerie les profits de `wallet` : le solde
+        au-delà de son capital de départ (au moins `keep_wei`, fonds de
+        roulement) + coût du transfert, si le wallet n'a plus de position
+        ouverte. Retourne le hash de la TX envoyée.
+        """
+        with self._lock:
+            if wallet.address == self.treasury or wallet.positions:
+                return None
+
+        latest   = self.web3.eth.get_block('latest')
+        base_fee = latest.get('baseFeePerGas', self.web3.to_wei(5, 'gwei'))
+        tip      = self.web3.to_wei(1, 'gwei')
+        max_fee  = base_fee * 2 + tip
+        gas_cost = 21000 * max_fee
+
+        balance = wallet.refresh_balance()
+        if wallet.funded_wei is None:
+            # Solde illisible au démarrage : le capital est fixé maintenant
+            wallet.funded_wei = balance
+            return None
+        amount = balance - max(wallet.funded_wei, keep_wei) - gas_cost
+        if amount <= 0:
+            return None
+        with self._lock:
+            # Une nouvelle position a pu être affectée entre-temps
+            if wallet.positions:
+                return None
+            # Réservation optimiste, comme dans acquire()
+            wallet.balance_wei -= amount + gas_cost
+        try:
+            txh = wallet.sign_and_send({
+                'to':                   self.treasury,
+                'from':                 wallet.address,
+                'value':                amount,
+                'gas':                  21000,
+                'maxFeePerGas':         max_fee,
+                'maxPriorityFeePerGas': tip,
+                'nonce':                wallet.next_nonce(),
+                'chainId':              self.web3.eth.chain_id
+            })
+        except Exception:
+            wallet.refresh_balance()
+            raise
+        print(f"🧹 Balayage {self.web3.from_wei(amount, 'ether')} ETH {wallet.address} → trésorerie: {txh.hex()}")
+        return txh.hex()
+
+    def summary(self) -> List[str]:
+        return [
+            f"{w.address} : {Decimal(w.balance_wei) / Decimal(10**18):.4f} ETH, {len(w.positions)} position(s)"
+            for w in self.wallets
+        ]
@@ -14,10 +14,19 @@ from config import (
     BASE_TOKENS,
     MIN_LIQUIDITY,
     BSCSCAN_API_KEY,
+    BSCSCAN_API_URL,
     WALLET_ADDRESS,
-    WBNB_ADDRESS
+    WBNB_ADDRESS,
+    WATCH_MODE,
+    LOGS_CHUNK_SIZE,
+    HTTP_POLL_MIN,
+    HTTP_POLL_MAX,
+    BYTECODE_INDEX_PATH
 )
 from token_checker import is_token_safe
+from journal import log_candidate, log_verdict, stage
+from rpc_cache import install as install_rpc_cache
+from bytecode_index import BytecodeIndex
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -34,6 +43,7 @@ def connect_web3(max_attempts: int = 3, delay: int = 5) -> Web3:
                 w3 = Web3(Web3.WebsocketProvider(provider_url)) if provider_url.startswith('ws') else Web3(Web3.HTTPProvider(provider_url))
                 if geth_poa_middleware not in w3.middleware_onion:
                     w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+                install_rpc_cache(w3)
                 if w3.is_connected():
                     print(f"✅ Web3 connecté via {provider_url}")
                     return w3
@@ -50,7 +60,7 @@ def is_verified_contract(address: str) -> bool:
     """
     try:
         url = (
-            f"https://api.bscscan.com/api?module=contract&action=getsourcecode"
+            f"{BSCSCAN_API_URL}?module=contract&action=getsourcecode"
             f"&address={address}&apikey={BSCSCAN_API_KEY}"
         )
         resp = requests.get(url, timeout=5).json()
@@ -60,6 +70,178 @@ def is_verified_contract(address: str) -> bool:
         return False
 
 
+def get_logs_chunked(w3: Web3, from_block: int, to_block: int, address: str, topic: str,
+                     chunk: int = LOGS_CHUNK_SIZE) -> list:
+    """
+    eth_getLogs découpé en tranches de `chunk` blocs, pour les providers
+    qui plafonnent la plage d'un appel.
+    """
+    logs = []
+    start = from_block
+    while start <= to_block:
+        end = min(start + chunk - 1, to_block)
+        logs.extend(w3.eth.get_logs({
+            "fromBlock": start,
+            "toBlock":   end,
+            "address":   address,
+            "topics":    [topic]
+        }))
+        start = end + 1
+    return logs
+
+
+def estimate_block_time(w3: Web3, sample: int = 20, default: float = 2.0) -> float:
+    """
+    Temps de bloc moyen sur les `sample` derniers blocs.
+    """
+    try:
+        latest = w3.eth.get_block('latest')
+        older  = w3.eth.get_block(max(latest.number - sample, 0))
+        span   = latest.number - older.number
+        if span > 0 and latest.timestamp > older.timestamp:
+            return (latest.timestamp - older.timestamp) / span
+    except Exception as e:
+        print(f"⚠️ Estimation temps de bloc impossible: {e}")
+    return default
+
+
+def poll_block_range(w3: Web3, address: str, topic: str, last_block: int):
+    """
+    Mode classique : eth_blockNumber toutes les 0.5s puis eth_getLogs sur la
+    plage de nouveaux blocs. Yield des lots de logs.
+    """
+    while True:
+        current = w3.eth.block_number
+        if current <= last_block:
+            time.sleep(0.5)
+            continue
+
+        try:
+            logs = get_logs_chunked(w3, last_block + 1, current, address, topic)
+        except Exception as e:
+            notify_error(f"❌ get_logs PairCreated failed: {e}")
+            time.sleep(1)
+            continue
+
+        print(f"🔍 {len(logs)} nouveaux PairCreated ({last_block+1}→{current})")
+        yield logs
+
+        last_block = current
+        time.sleep(0.5)
+
+
+def _is_filter_lost(error: Exception) -> bool:
+    """
+    Erreur signifiant que le noeud a oublié le filtre (expiré / redémarré).
+    """
+    msg = str(error).lower()
+    return "filter not found" in msg or "filter does not exist" in msg
+
+
+def _uninstall_filter(w3: Web3, filter_id: str):
+    """
+    Best-effort : libère le filtre côté noeud (quota par clé d'API).
+    """
+    try:
+        w3.eth.uninstall_filter(filter_id)
+    except Exception:
+        pass
+
+
+def poll_log_filter(w3: Web3, address: str, topic: str, last_block: int,
+                    checkpoint_every: int = 20, max_errors: int = 5):
+    """
+    Mode HTTP : filtre de logs côté serveur (eth_newFilter) interrogé par
+    eth_getFilterChanges, soit une seule requête par tick. L'intervalle de
+    poll suit le temps de bloc, réestimé à chaque checkpoint.
+
+    Si le noeud a oublié le filtre ("filter not found"), il est recréé puis
+    les blocs manqués depuis le dernier checkpoint sont rattrapés par
+    eth_getLogs découpé. Les autres erreurs (timeouts…) déclenchent un
+    backoff exponentiel sur le même filtre ; il n'est recréé (après
+    désinstallation) qu'au bout de `max_errors` échecs consécutifs.
+    Les doublons éventuels sont éliminés en aval (set `seen`).
+    Yield des lots de logs.
+    """
+    block_time = estimate_block_time(w3)
+    filter_id  = None
+    polls      = 0
+    errors     = 0
+    cp_block, cp_time = last_block, time.monotonic()
+
+    while True:
+        interval = min(max(block_time / 2, HTTP_POLL_MIN), HTTP_POLL_MAX)
+
+        # 1) (Re)création du filtre puis rattrapage des blocs manqués
+        if filter_id is None:
+            try:
+                filter_id = w3.eth.filter({
+                    "fromBlock": last_block + 1,
+                    "address":   address,
+                    "topics":    [topic]
+                }).filter_id
+                current = w3.eth.block_number
+                missed  = get_logs_chunked(w3, last_block + 1, current, address, topic) if current > last_block else []
+            except Exception as e:
+                notify_error(f"❌ Création filtre PairCreated échouée: {e}")
+                if filter_id is not None:
+                    _uninstall_filter(w3, filter_id)
+                filter_id = None
+                errors += 1
+                time.sleep(min(2 ** errors, 30))
+                continue
+            errors = 0
+            print(f"📡 Filtre {filter_id} actif (bloc ≈{block_time:.2f}s, poll {interval:.2f}s), "
+                  f"rattrapage {len(missed)} logs ({last_block+1}→{current})")
+            last_block = max(last_block, current)
+            cp_block, cp_time = current, time.monotonic()
+            if missed:
+                yield missed
+
+        # 2) Checkpoint périodique : bloc courant AVANT le poll, pour que
+        #    tous les logs ≤ checkpoint soient livrés par ce poll
+        polls += 1
+        head = None
+        if polls % checkpoint_every == 0:
+            try:
+                head = w3.eth.block_number
+            except Exception as e:
+                print(f"⚠️ eth_blockNumber échoué: {e}")
+
+        # 3) Changements du filtre
+        try:
+            logs = w3.eth.get_filter_changes(filter_id)
+        except Exception as e:
+            errors += 1
+            if _is_filter_lost(e) or errors >= max_errors:
+                print(f"♻️ Filtre {filter_id} perdu ({e}), recréation…")
+                _uninstall_filter(w3, filter_id)
+                filter_id = None
+                errors = 0
+                continue
+            # Erreur transitoire : on garde le filtre et on espace les polls
+            backoff = min(interval * 2 ** errors, 10)
+            print(f"⚠️ eth_getFilterChanges échoué ({e}), nouvel essai dans {backoff:.1f}s")
+            time.sleep(backoff)
+            continue
+        errors = 0
+
+        if head is not None:
+            now = time.monotonic()
+            if head > cp_block:
+                # Moyenne glissante du temps de bloc observé
+                block_time = 0.7 * block_time + 0.3 * (now - cp_time) / (head - cp_block)
+            last_block = max(last_block, head)
+            cp_block, cp_time = head, now
+
+        if logs:
+            last_block = max(last_block, max(log["blockNumber"] for log in logs))
+            print(f"🔍 {len(logs)} nouveaux PairCreated (filtre, bloc {last_block})")
+            yield logs
+
+        time.sleep(interval)
+
+
 def watch_for_pairs():
     """
     Générateur détectant PairCreated pour n'importe quelle base de BASE_TOKENS,
@@ -68,7 +250,7 @@ def watch_for_pairs():
       • contrat vérifié
       • liquidité ≥ MIN_LIQUIDITY (OR)
       • honeypot-check via is_token_safe()
-    Yield dict(token, base, pair).
+    Yield dict(token, base, pair)
     """
     w3 = connect_web3()
     if not w3:
@@ -79,6 +261,7 @@ def watch_for_pairs():
         factory_abi = json.load(open(os.path.join(BASE_DIR, "factory_abi.json")))
         pair_abi    = json.load(open(os.path.join(BASE_DIR, "pair_abi.json")))
         router_abi  = json.load(open(os.path.join(BASE_DIR, "router_abi.json")))
+        erc20_abi   = json.load(open(os.path.join(BASE_DIR, "erc20_abi.json")))
     except Exception as e:
         notify_error(f"❌ Erreur chargement ABIs: {e}")
         return
@@ -103,33 +286,23 @@ def watch_for_pairs():
         return
     topic = w3.keccak(text="PairCreated(address,address,address,uint256)").hex()
 
+    bytecode_index = BytecodeIndex(BYTECODE_INDEX_PATH) if BYTECODE_INDEX_PATH else None
+
     last_block = w3.eth.block_number
     seen = set()
     print(f"📡 Surveillance PairCreated démarrée au bloc {last_block}")
 
-    while True:
-        current = w3.eth.block_number
-        if current <= last_block:
-            time.sleep(0.5)
-            continue
-
-        # 4) Récupérer les logs PairCreated
-        try:
-            logs = w3.eth.get_logs({
-                "fromBlock": last_block + 1,
-                "toBlock":   current,
-                "address":   Web3.to_checksum_address(FACTORY_ADDRESS),
-                "topics":    [topic]
-            })
-        except Exception as e:
-            notify_error(f"❌ get_logs PairCreated failed: {e}")
-            time.sleep(1)
-            continue
+    # 4) Source des logs PairCreated : filtre serveur en HTTP, plages sinon
+    use_filter = WATCH_MODE == "filter" or (
+        WATCH_MODE == "auto" and isinstance(w3.provider, Web3.HTTPProvider)
+    )
+    poll = poll_log_filter if use_filter else poll_block_range
+    factory_addr = Web3.to_checksum_address(FACTORY_ADDRESS)
 
-        print(f"🔍 {len(logs)} nouveaux PairCreated ({last_block+1}→{current})")
+    for logs in poll(w3, factory_addr, topic, last_block):
         for log in logs:
             try:
-                evt = w3.codec.decode_log(event_abi, log["data"], log["topics"])
+                evt = factory.events.PairCreated().process_log(log)
                 t0, t1 = Web3.to_checksum_address(evt['args']['token0']), Web3.to_checksum_address(evt['args']['token1'])
                 pair   = evt['args']['pair']
                 blk    = log['blockNumber']
@@ -146,37 +319,67 @@ def watch_for_pairs():
                 seen.add(pair)
 
                 # 7) Vérif liquidity minimale (OR)
-                r0, r1, _ = w3.eth.contract(address=pair, abi=pair_abi).functions.getReserves().call()
+                with stage("reserves", token):
+                    r0, r1, _ = w3.eth.contract(address=pair, abi=pair_abi).functions.getReserves().call()
+                log_candidate(token, pair, blk, r0, r1)
                 if r0 < MIN_LIQUIDITY or r1 < MIN_LIQUIDITY:
+                    log_verdict(token, False, "Liquidité insuffisante", pair)
                     notify_ignored_pair("Liquidité insuffisante", token, base, pair)
                     continue
 
-                # 8) Contrat vérifié sur BscScan
-                if not is_verified_contract(token):
-                    notify_ignored_pair("Contrat non vérifié", token, base, pair)
+                # 8) Empreinte bytecode : clone d'un template déjà jugé ?
+                fp, known = None, None
+                if bytecode_index:
+                    try:
+                        with stage("bytecode", token):
+                            fp, known = bytecode_index.lookup(w3, token)
+                    except Exception as e:
+                        # Sans empreinte : simulation complète, rien n'est enregistré
+                        print(f"⚠️ Empreinte bytecode indisponible pour {token}: {e}")
+                        fp, known = None, None
+                if known is False:
+                    reason = f"Clone d'un template rejeté: {bytecode_index.reason(fp)}"
+                    log_verdict(token, False, reason, pair)
+                    notify_ignored_pair(reason, token, base, pair)
                     continue
 
-                # 9) Honeypot / taxe
-                safe, reason = is_token_safe(
-                    web3=w3,
-                    router=router,
-                    token_address=token,
-                    base_token=base,
-                    wallet=WALLET_ADDRESS,
-                    erc20_abi=pair_abi,
-                    native_wrap=WBNB_ADDRESS
-                )
-                if not safe:
-                    notify_ignored_pair(f"Honeypot/taxe fail: {reason}", token, base, pair)
-                    continue
+                if known is None:
+                    # 9) Contrat vérifié sur BscScan
+                    with stage("verified", token):
+                        verified = is_verified_contract(token)
+                    if not verified:
+                        log_verdict(token, False, "Contrat non vérifié", pair)
+                        notify_ignored_pair("Contrat non vérifié", token, base, pair)
+                        continue
 
-                # 10) OK → notifie + yield
+                    # 10) Honeypot / taxe (simulation complète → alimente l'index)
+                    details = {}
+                    with stage("token_safe", token):
+                        safe, reason = is_token_safe(
+                            web3=w3,
+                            router=router,
+                            token_address=token,
+                            base_token=base,
+                            wallet=WALLET_ADDRESS,
+                            erc20_abi=erc20_abi,
+                            native_wrap=WBNB_ADDRESS,
+                            details=details
+                        )
+                    # Seuls les verdicts définitifs (revente, taxe) décrivent le
+                    # template ; erreurs RPC et achats refusés ne disent rien
+                    if bytecode_index and details.get("definitive"):
+                        bytecode_index.record(fp, safe, reason)
+                    log_verdict(token, safe, reason, pair)
+                    if not safe:
+                        notify_ignored_pair(f"Honeypot/taxe fail: {reason}", token, base, pair)
+                        continue
+                else:
+                    log_verdict(token, True, "Template sûr connu", pair)
+
+                # 11) OK → notifie + yield
                 delay = int(time.time()) - w3.eth.get_block(blk).timestamp
                 notify_valid_pair(token, base, pair, blk, delay, r0, r1)
                 yield {"token": token, "base": base, "pair": pair}
 
             except Exception as e:
                 notify_error(f"⚠️ Erreur processing log: {e}")
-
-        last_block = current
-        time.sleep(0.5)